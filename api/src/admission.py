@@ -0,0 +1,223 @@
+import math
+import os
+import shutil
+import time
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from loguru import logger
+from sqlalchemy import select, func
+
+from shared.control import get_redis
+from shared.db_models import Task
+from shared.metrics import ADMISSION_REJECTIONS
+from shared.storage import UPLOAD_DIR
+
+
+# Admission control: new work is refused quickly with 429 (this client is
+# over its quota) or 503 (the service is over capacity) and a Retry-After,
+# instead of being accepted into an ever-growing queue. Limits set to 0 are
+# off.
+
+# prefork slots across all workers
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", os.cpu_count() or 1))
+# queued Celery messages allowed per slot before uploads are refused; with
+# ADMISSION_TASK_SECONDS this bounds how long an accepted task can wait
+MAX_QUEUE_PER_SLOT = int(os.getenv("MAX_QUEUE_PER_SLOT", 25))
+# typical task duration, used to estimate Retry-After
+TASK_SECONDS = float(os.getenv("ADMISSION_TASK_SECONDS", 10))
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", 1024)) * 1024**2)
+# uploads are refused when they would leave less than this on the volume
+MIN_FREE_DISK_BYTES = int(float(os.getenv("MIN_FREE_DISK_GB", 2)) * 1024**3)
+# uploads being received at once by one API process
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", 16))
+
+# per client: bytes uploaded per window, and tasks queued or running
+CLIENT_UPLOAD_QUOTA_BYTES = int(float(os.getenv("CLIENT_UPLOAD_QUOTA_MB", 5 * 1024)) * 1024**2)
+QUOTA_WINDOW_SECONDS = int(os.getenv("QUOTA_WINDOW_SECONDS", 60 * 60))
+MAX_JOBS_PER_CLIENT = int(os.getenv("MAX_JOBS_PER_CLIENT", 10))
+# header set by an authenticating proxy (e.g. X-Client-Id); the peer
+# address is used when unset
+CLIENT_ID_HEADER = os.getenv("CLIENT_ID_HEADER")
+
+CSV_QUEUE = "csv_processing"
+# Celery's Redis transport keeps one list per priority step
+QUEUE_KEYS = [CSV_QUEUE] + [f"{CSV_QUEUE}:{step}" for step in range(1, 10)]
+# queue depth is read at most this often per process
+DEPTH_CACHE_SECONDS = 1.0
+# cap on the estimated wait when the queue is full
+RETRY_AFTER_MAX = 300
+
+# body size is enforced for these; the rest of admit_upload for /upload only
+UPLOAD_PATHS = {"/upload", "/references"}
+
+_depth_cache = {"at": 0.0, "depth": None}
+
+
+def client_id(request: Request):
+    if CLIENT_ID_HEADER and request.headers.get(CLIENT_ID_HEADER):
+        return request.headers[CLIENT_ID_HEADER]
+    return request.client.host if request.client else "unknown"
+
+
+def reject(status_code, reason, detail, retry_after=None):
+    ADMISSION_REJECTIONS.labels(reason=reason).inc()
+    logger.warning(f"Admission: refused ({reason}): {detail}")
+    headers = None
+    if retry_after is not None:
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+    raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+
+def queue_depth():
+    """Messages waiting in the CSV queue, or None when Redis can't be read"""
+    now = time.monotonic()
+    if now - _depth_cache["at"] < DEPTH_CACHE_SECONDS:
+        return _depth_cache["depth"]
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in QUEUE_KEYS:
+            pipe.llen(key)
+        depth = sum(pipe.execute())
+    except Exception as e:
+        # fail open: losing admission control beats refusing every upload
+        logger.warning(f"Admission: could not read queue depth: {e}")
+        depth = None
+    _depth_cache.update(at=now, depth=depth)
+    return depth
+
+
+def queue_budget():
+    return MAX_QUEUE_PER_SLOT * WORKER_CONCURRENCY
+
+
+def check_capacity():
+    depth = queue_depth()
+    if not MAX_QUEUE_PER_SLOT or depth is None or depth < queue_budget():
+        return
+    # time for the workers to drain the queue back under budget
+    excess = depth - queue_budget() + 1
+    reject(503, "queue_full", f"Processing queue is full ({depth} waiting); try again later",
+           min(RETRY_AFTER_MAX, excess / WORKER_CONCURRENCY * TASK_SECONDS))
+
+
+def check_disk(incoming):
+    if not MIN_FREE_DISK_BYTES:
+        return
+    usage = shutil.disk_usage(UPLOAD_DIR if os.path.isdir(UPLOAD_DIR) else ".")
+    if usage.free - incoming < MIN_FREE_DISK_BYTES:
+        # storage_gc frees space on its own schedule
+        reject(503, "disk_full", "Not enough free disk space for this upload; try again later",
+               float(os.getenv("GC_INTERVAL_SECONDS", 600)))
+
+
+def _quota_key(client):
+    return f"csv:quota:upload:{client}"
+
+
+def check_upload_quota(client, incoming):
+    if not CLIENT_UPLOAD_QUOTA_BYTES:
+        return
+    try:
+        redis = get_redis()
+        used = int(redis.get(_quota_key(client)) or 0)
+        if used + incoming <= CLIENT_UPLOAD_QUOTA_BYTES:
+            return
+        ttl = redis.ttl(_quota_key(client))
+    except Exception as e:
+        logger.warning(f"Admission: could not read upload quota: {e}")
+        return
+    # the window resets when the counter expires
+    reject(429, "upload_quota",
+           f"Upload quota of {CLIENT_UPLOAD_QUOTA_BYTES // 1024**2} MB per "
+           f"{QUOTA_WINDOW_SECONDS}s exceeded",
+           ttl if ttl > 0 else QUOTA_WINDOW_SECONDS)
+
+
+def charge_upload(client, size):
+    """Count a stored upload against the client's quota window"""
+    if not CLIENT_UPLOAD_QUOTA_BYTES:
+        return
+    try:
+        pipe = get_redis().pipeline()
+        # the window starts with the first upload in it
+        pipe.set(_quota_key(client), 0, ex=QUOTA_WINDOW_SECONDS, nx=True)
+        pipe.incrby(_quota_key(client), size)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Admission: could not charge upload quota: {e}")
+
+
+async def check_job_limit(db, task):
+    """Refuse to queue `task` while its uploader has too many tasks in flight"""
+    if not MAX_JOBS_PER_CLIENT or not task.client_id:
+        return
+    active = await db.scalar(select(func.count()).select_from(Task).where(
+        Task.client_id == task.client_id, Task.id != task.id,
+        Task.status.in_(["queued", "processing"])))
+    if active >= MAX_JOBS_PER_CLIENT:
+        reject(429, "job_limit",
+               f"At most {MAX_JOBS_PER_CLIENT} tasks may be queued or running per client",
+               TASK_SECONDS)
+
+
+def admit_upload(request: Request, length):
+    """All pre-body checks for an upload of `length` bytes (0 if unknown)"""
+    if MAX_UPLOAD_BYTES and length > MAX_UPLOAD_BYTES:
+        reject(413, "too_large", _too_large_detail())
+    check_disk(length)
+    if request.url.path == "/upload":
+        check_capacity()
+        check_upload_quota(client_id(request), length)
+
+
+def _too_large_detail():
+    return f"Upload exceeds the {MAX_UPLOAD_BYTES // 1024**2} MB limit"
+
+
+class AdmissionMiddleware:
+    """
+    Runs the admission checks for uploads before any of the body is read;
+    FastAPI spools the whole multipart body to disk before the endpoint
+    runs, so checks in the endpoint would come too late. Bodies without a
+    Content-Length (or lying about it) are cut off at MAX_UPLOAD_BYTES.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" \
+                or scope["path"] not in UPLOAD_PATHS:
+            return await self.app(scope, receive, send)
+
+        request = Request(scope)
+        try:
+            if MAX_CONCURRENT_UPLOADS and self.in_flight >= MAX_CONCURRENT_UPLOADS:
+                reject(503, "busy", "Too many uploads in progress; try again shortly", 1)
+            length = int(request.headers.get("content-length") or 0)
+            # Redis and disk lookups are blocking calls
+            await run_in_threadpool(admit_upload, request, length)
+        except HTTPException as e:
+            response = JSONResponse({"detail": e.detail}, e.status_code, headers=e.headers)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if MAX_UPLOAD_BYTES and received > MAX_UPLOAD_BYTES:
+                    # FastAPI passes an HTTPException from body parsing through
+                    reject(413, "too_large", _too_large_detail())
+            return message
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            self.in_flight -= 1
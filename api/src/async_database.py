@@ -0,0 +1,37 @@
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import os
+
+from src.database import db_url
+
+# The API talks to the database through asyncpg so queries never block the
+# event loop. This lives apart from database.py because the worker imports
+# that module and has no use for an asyncio driver.
+
+
+def to_async_url(url):
+    """Swap the sync driver in DATABASE_URL for its asyncio counterpart"""
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+pool_options = {}
+if not db_url.startswith("sqlite"):
+    pool_options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": 1800,  # stay under idle-connection timeouts
+        "pool_pre_ping": True,
+    }
+
+async_engine = create_async_engine(to_async_url(db_url), **pool_options)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
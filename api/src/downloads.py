@@ -0,0 +1,124 @@
+import os
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from shared.storage import CHUNK_SIZE, OUTPUT_DIR
+
+
+# When set (e.g. "/protected-output/"), downloads are handed to the reverse
+# proxy with X-Accel-Redirect and the API never reads result bytes; nginx
+# then serves the file with sendfile and does ranges/conditionals itself.
+ACCEL_REDIRECT_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX")
+
+# results are written once and never modified, so clients may cache forever
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def _content_disposition(filename):
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def _parse_range(header, size):
+    """
+    Parse a single `bytes=start-end` range. Returns (start, end) inclusive,
+    None when the header should be ignored (missing, malformed or several
+    ranges, in which case the full body is sent), or "unsatisfiable".
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    try:
+        if start == "":
+            # suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                return "unsatisfiable"
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+def _iter_file(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def result_response(request: Request, path, sha256, media_type="text/csv"):
+    """
+    Serve an immutable result file with a strong ETag, conditional GET (304),
+    single byte-range requests (206) and optional reverse-proxy offload.
+    """
+    size = os.path.getsize(path)
+    etag = f'"{sha256}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": _content_disposition(os.path.basename(path)),
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if ACCEL_REDIRECT_PREFIX:
+        relative = os.path.relpath(path, OUTPUT_DIR).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative)
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    byte_range = _parse_range(request.headers.get("range"), size)
+    # If-Range: only honour the range if the client has the current version
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        byte_range = None
+
+    if byte_range == "unsatisfiable":
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        start, end = 0, size - 1
+        status_code = 200
+
+    length = end - start + 1 if size else 0
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
@@ -1,37 +1,59 @@
 import uuid
 import os
+import re
 import shutil
-import pandas as pd
 import sys
+import time
 from datetime import datetime
 
 from fastapi import FastAPI, Form, File, UploadFile, Request, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, JSONResponse, RedirectResponse
 from fastapi.encoders import jsonable_encoder
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select, func
 from loguru import logger
-from celery.result import AsyncResult
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from shared.schemas import ConfigSchema
-from shared.db_models import Task, Base
-from src.database import get_db, engine
-from worker.src.tasks import process_csv_task
+from pydantic import ValidationError
+from shared.schemas import ConfigSchema, ValidateParams
+from shared.db_models import Task, ReferenceTable, Pipeline, Base, add_missing_columns
+from shared.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, render_metrics
+from src.async_database import get_async_db, async_engine
+from src.downloads import result_response
+from src.admission import (
+    AdmissionMiddleware, WORKER_CONCURRENCY, MIN_FREE_DISK_BYTES, client_id, charge_upload,
+    check_capacity, check_job_limit, queue_depth, queue_budget
+)
+from shared.storage import (
+    file_sha256, store_upload, store_reference_source, reference_dir, release_tree, release_file
+)
+from shared.control import request_cancel, request_preempt, PRIORITIES
+from shared.task_signatures import process_csv, build_reference, revoke
+from shared.progress import read_progress
+from shared.tracing import start_span, inject, set_service_name, read_trace, summarize
 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
     logger.info("App started 🚀")
     yield
-    
+    await async_engine.dispose()
 
 
+set_service_name("csv-api")
+# e.g. http://localhost:16686/trace/{trace_id} to open traces in Jaeger
+# instead of the span list kept by the file exporter
+TRACE_UI_URL = os.getenv("TRACE_UI_URL")
+
 app = FastAPI(title="Projo 1", lifespan=lifespan)
+app.add_middleware(AdmissionMiddleware)
 templates = Jinja2Templates(directory='templates')
 logger.remove()
 logger.add(
@@ -46,8 +68,38 @@ logger.add(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # label by route template (/tasks/{task_id}) so task ids don't explode
+    # the number of series
+    route = request.scope.get("route")
+    labels = {
+        "method": request.method,
+        "route": route.path if route else "unmatched",
+        "status": response.status_code,
+    }
+    HTTP_REQUEST_SECONDS.labels(**labels).observe(time.perf_counter() - start)
+    HTTP_REQUESTS.labels(**labels).inc()
+    return response
+
+
+@app.get("/metrics")
+def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
+async def get_task_or_404(db: AsyncSession, task_id: str):
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
 @app.get("/health")
-def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     health_status = {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
@@ -57,7 +109,7 @@ def health_check(db: Session = Depends(get_db)):
     }
 
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         health_status["checks"]["database"] = "up"
     except Exception as e:
         health_status["status"] = "unhealthy"
@@ -75,11 +127,17 @@ def health_check(db: Session = Depends(get_db)):
             "percent_used": round((usage.used / usage.total) * 100, 2)
         }
 
-        if (usage.used / usage.total) > 0.95:
+        # uploads are refused below MIN_FREE_DISK_GB, so degrade there too
+        if (usage.used / usage.total) > 0.95 or usage.free < MIN_FREE_DISK_BYTES:
             health_status["status"] = "degraded"
     else:
         health_status["checks"]["disk_space"] = "directory_not_found"
 
+    depth = await run_in_threadpool(queue_depth)
+    health_status["checks"]["queue"] = {"depth": depth, "budget": queue_budget()}
+    if depth is not None and depth >= queue_budget():
+        health_status["status"] = "degraded"
+
     if health_status["status"] == "unhealthy":
         raise HTTPException(status_code=503, detail=health_status)
 
@@ -88,27 +146,31 @@ def health_check(db: Session = Depends(get_db)):
 
 # =====================PAGES===================
 @app.get("/")
-def homepage(request: Request, db: Session = Depends(get_db)):
+async def homepage(request: Request):
     return templates.TemplateResponse('home.html', {"request": request})
 
 @app.get("/admin")
-def admin(request: Request, db: Session = Depends(get_db)):
-    tasks = db.query(Task).order_by(Task.created_at.desc()).all()
+async def admin(request: Request, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Task).order_by(Task.created_at.desc()))
+    tasks = result.scalars().all()
     return templates.TemplateResponse('admin.html', {"request": request, "tasks": tasks})
 
+
+def render_preview(file_path):
+    # pandas is only needed here, so the API doesn't load it at startup
+    import pandas as pd
+    df = pd.read_csv(file_path, nrows=5)
+    return df.to_html(classes='table table-striped', index=False)
+
+
 @app.get("/tasks/{task_id}")
-def get_taskpage(task_id: str, request: Request, db: Session = Depends(get_db)):
-    task = db.query(Task).filter(
-        Task.id == task_id).order_by(Task.created_at).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+async def get_taskpage(task_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    task = await get_task_or_404(db, task_id)
 
     preview_html = ""
     if task.file_path and os.path.exists(task.file_path):
         try:
-            df = pd.read_csv(task.file_path, nrows=5) 
-            preview_html = df.to_html(
-                classes='table table-striped', index=False)
+            preview_html = await run_in_threadpool(render_preview, task.file_path)
             logger.info("CSV preview generated successfully")
         except Exception as e:
             logger.warning(f"Could not generate preview: {str(e)}")
@@ -129,53 +191,64 @@ def get_taskpage(task_id: str, request: Request, db: Session = Depends(get_db)):
 # =====================API ENDPOINTS===================
 
 @app.get("/tasks")
-def all_tasks(request: Request, db: Session = Depends(get_db)):
+async def all_tasks(request: Request, db: AsyncSession = Depends(get_async_db)):
     status_filter = request.query_params.get("")
-    query = db.query(Task)
+    query = select(Task)
     if status_filter and status_filter in ["processing", "completed", "cancelled", "pending", "failed"]:
-        query = query.filter(Task.status == status_filter)
-    tasks = query.order_by(Task.created_at.desc()).all()
-    return tasks
+        query = query.where(Task.status == status_filter)
+    result = await db.execute(query.order_by(Task.created_at.desc()))
+    return result.scalars().all()
 
 
 @app.get("/task/{task_id}")
-async def get_task_by_id(task_id: str, db: Session = Depends(get_db)):
-    task = db.query(Task).filter(
-        Task.id == task_id).order_by(Task.created_at).first()
-    return task
+async def get_task_by_id(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await db.get(Task, task_id)
+
+
 
 
 @app.post("/upload")
 async def create_task(
+    request: Request,
     csv_file: UploadFile = File(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
 
     # 1. Validate file
     if not csv_file.filename.endswith('.csv'):
         return {"error": "Only CSV files are allowed"}
 
-    # 2. Save to filesystem
     task_id = str(uuid.uuid4())
-    saved_file = f"{task_id}.csv"
-    file_path = os.path.join('uploads', saved_file)
-    logger.info(f"File Uploaded successfully : {file_path}")
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(csv_file.file, buffer)
-
-    # 3. Create task record in database
-    db_task = Task(
-        id=task_id,
-        filename=saved_file,
-        original_filename=csv_file.filename,
-        status="pending",
-        file_path=file_path,
-        created_at=datetime.now()
-    )
+    # the task's trace starts here, or continues the caller's if it sent one
+    with start_span("upload", parent=request.headers.get("traceparent"),
+                    task_id=task_id, filename=csv_file.filename) as span:
+        # 2. Save to filesystem (deduplicated by content hash)
+        saved_file = f"{task_id}.csv"
+        with start_span("store_upload") as store_span:
+            # disk writes go to a thread so a large upload doesn't stall the loop
+            file_path, upload_sha256, upload_size = await run_in_threadpool(
+                store_upload, csv_file.file, task_id)
+            store_span.set(bytes=upload_size)
+        logger.info(f"File Uploaded successfully : {file_path}")
+
+        # 3. Create task record in database
+        db_task = Task(
+            id=task_id,
+            filename=saved_file,
+            original_filename=csv_file.filename,
+            status="pending",
+            file_path=file_path,
+            upload_sha256=upload_sha256,
+            upload_size=upload_size,
+            client_id=client_id(request),
+            created_at=datetime.now(),
+            traceparent=span.traceparent,
+        )
 
-    db.add(db_task)
-    db.commit()
+        with start_span("db.commit"):
+            db.add(db_task)
+            await db.commit()
+        await run_in_threadpool(charge_upload, db_task.client_id, upload_size)
     logger.info(f"Task  created successfully;  Task ID: {task_id}")
 
     return {
@@ -187,24 +260,125 @@ async def create_task(
     }
 
 
+async def preempt_for_high_priority(db: AsyncSession):
+    """
+    When every worker slot is busy, ask the most recently started low-priority
+    task to yield. It checkpoints at its next stage boundary and requeues
+    itself behind the high-priority work.
+    """
+    result = await db.execute(select(Task).where(Task.status == "processing"))
+    running = result.scalars().all()
+    if len(running) < WORKER_CONCURRENCY:
+        return None
+
+    victims = [t for t in running if (t.config or {}).get("priority") == "low"]
+    if not victims:
+        return None
+    victim = max(victims, key=lambda t: t.started_at or datetime.min)
+    await run_in_threadpool(request_preempt, victim.id)
+    logger.info(f"Preempting task {victim.id} for high-priority work")
+    return victim.id
+
+
+async def resolve_pipelines(db: AsyncSession, config: ConfigSchema):
+    """Replace pipelines given by saved-pipeline name with that pipeline's operations"""
+    for name, ops in config.pipelines.items():
+        if not isinstance(ops, str):
+            continue
+        saved = await db.get(Pipeline, ops)
+        if not saved:
+            raise HTTPException(status_code=400, detail=f"Pipeline {name}: no saved pipeline '{ops}'")
+        if saved.config.get("pipelines"):
+            raise HTTPException(
+                status_code=400, detail=f"Pipeline {name}: '{ops}' is itself a multi-config pipeline")
+        config.pipelines[name] = saved.config.get("operations", [])
+
+
+def operation_label(pipeline, index):
+    return f"Pipeline {pipeline}, operation {index + 1}" if pipeline else f"Operation {index + 1}"
+
+
+async def check_lookup_tables(db: AsyncSession, config: ConfigSchema):
+    """Reject configs that look up tables the workers could not open"""
+    for op in (op for _, ops in config.operation_lists() for op in ops):
+        if not isinstance(op, dict) or op.get("op") != "lookup":
+            continue
+        name = (op.get("params") or {}).get("table")
+        ref = await db.get(ReferenceTable, name) if name else None
+        if not ref or not ref.path:
+            raise HTTPException(
+                status_code=400, detail=f"Reference table '{name}' is not registered or not built yet")
+
+
+def check_validate_ops(config: ConfigSchema):
+    """Reject malformed `validate` rules now rather than in the worker"""
+    for pipeline, ops in config.operation_lists():
+        for i, op in enumerate(ops):
+            if not isinstance(op, dict) or op.get("op") != "validate":
+                continue
+            try:
+                ValidateParams.model_validate(op.get("params") or {})
+            except ValidationError as e:
+                problems = "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+                raise HTTPException(
+                    status_code=400, detail=f"{operation_label(pipeline, i)} (validate): {problems}")
+
+
+async def check_continue_from(db: AsyncSession, config: ConfigSchema):
+    """A continue-mode task needs a finished incremental run with the same pipeline"""
+    if not config.continue_from:
+        return
+    previous = await db.get(Task, config.continue_from)
+    if not previous or previous.status != "completed" or not previous.delta_state:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Task {config.continue_from} has no continue state to resume from")
+    if (previous.config or {}).get("operations") != config.operations:
+        raise HTTPException(
+            status_code=400, detail="Continue mode needs the same operations as the previous task")
+
+
 @app.put("/task/{task_id}")
 async def task_configuration(task_id: str,
                              config: ConfigSchema,
-                             db: Session = Depends(get_db)
+                             db: AsyncSession = Depends(get_async_db)
                              ):
-    task = db.query(Task).filter(
-        Task.id == task_id).order_by(Task.created_at).first()
+    task = await get_task_or_404(db, task_id)
+    with start_span("configure", parent=task.traceparent,
+                    task_id=task_id, priority=config.priority):
+        return await queue_configured_task(db, task, config)
+
+
+async def queue_configured_task(db: AsyncSession, task: Task, config: ConfigSchema):
+    task_id = task.id
+    with start_span("validate_config", pipelines=len(config.pipelines) or 1):
+        await resolve_pipelines(db, config)
+        check_validate_ops(config)
+        await check_lookup_tables(db, config)
+        await check_continue_from(db, config)
+    # backpressure: refuse before the task is marked queued
+    await check_job_limit(db, task)
+    await run_in_threadpool(check_capacity)
 
     task.config = config.model_dump()
     task.status = "queued"
+    task.queued_at = datetime.now()
     logger.info(f"Config for Task {task_id} updated successfully")
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
 
     try:
-        result = process_csv_task.delay(task_id)
+        # publishing to the broker is blocking network I/O; the headers carry
+        # the trace context and publish time into the worker
+        with start_span("enqueue"):
+            result = await run_in_threadpool(
+                process_csv(task_id, PRIORITIES[config.priority]).apply_async,
+                headers=inject())
         task.celery_task_id = result.id
-        db.commit()
+        await db.commit()
+        if config.priority == "high":
+            await preempt_for_high_priority(db)
         logger.info(
             f"Task {task_id} queued. Celery Task ID: {result.id}")
 
@@ -219,7 +393,7 @@ async def task_configuration(task_id: str,
     except Exception as e:
         logger.error(f"Failed to queue task {task_id}: {str(e)}")
         task.status = "pending"
-        db.commit()
+        await db.commit()
 
         raise HTTPException(
             status_code=500,
@@ -228,23 +402,284 @@ async def task_configuration(task_id: str,
 
 
 
-@app.get("/tasks/{task_id}/download")
-def download_task_result(task_id: str, db: Session = Depends(get_db)):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    logger.info('download called')
-    return FileResponse(
-        path=task.result_path,
-        media_type="text/csv",
-        filename=os.path.basename(task.result_path),
-    )
+@app.post("/tasks/{task_id}/cancel")
+async def cancel_task(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    task = await get_task_or_404(db, task_id)
+    if task.status in ["completed", "failed", "cancelled"]:
+        raise HTTPException(status_code=409, detail=f"Task is already {task.status}")
+
+    # the flag covers a worker that picked the message up a moment ago
+    await run_in_threadpool(request_cancel, task_id)
+
+    if task.status == "processing":
+        logger.info(f"Cancellation requested for running task {task_id}")
+        return JSONResponse(status_code=202, content={
+            "task_id": task_id,
+            "status": "cancelling",
+            "message": "The task will stop at its next checkpoint",
+        })
+
+    # pending/queued: drop the broker message so it never takes a slot,
+    # unless it is an inbox batch that other tasks still ride on; the
+    # worker skips cancelled tasks when it gets to them
+    if task.celery_task_id:
+        shared = await db.scalar(select(func.count()).select_from(Task).where(
+            Task.celery_task_id == task.celery_task_id, Task.id != task_id,
+            Task.status.in_(["queued", "processing"])))
+        if not shared:
+            await run_in_threadpool(revoke, task.celery_task_id)
+    if task.resume_state and task.resume_state.get("checkpoint"):
+        # checkpoints can be large; release_file trims them off the event loop
+        await run_in_threadpool(release_file, task.resume_state["checkpoint"])
+
+    task.status = "cancelled"
+    task.completed_at = datetime.now()
+    task.resume_state = None
+    await db.commit()
+    logger.info(f"Task {task_id} cancelled")
+    return {"task_id": task_id, "status": "cancelled"}
+
+
+@app.post("/admin/tasks/{task_id}/preempt")
+async def preempt_task(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    task = await get_task_or_404(db, task_id)
+    if task.status != "processing":
+        raise HTTPException(status_code=409, detail="Only running tasks can be preempted")
+
+    await run_in_threadpool(request_preempt, task_id)
+    logger.info(f"Preemption requested for task {task_id}")
+    return JSONResponse(status_code=202, content={
+        "task_id": task_id,
+        "status": "preempting",
+        "message": "The task will checkpoint and requeue at its next stage boundary",
+    })
+
+
+@app.api_route("/tasks/{task_id}/download", methods=["GET", "HEAD"])
+async def download_task_result(task_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    task = await get_task_or_404(db, task_id)
+    if task.outputs:
+        raise HTTPException(
+            status_code=404,
+            detail=f"This task has one output per pipeline: /tasks/{task_id}/outputs/<name>")
+    if task.status != "completed" or not task.result_path or not os.path.exists(task.result_path):
+        raise HTTPException(status_code=404, detail="Result not available")
+
+    # tasks completed before results were hashed get their digest on first download
+    if not task.result_sha256:
+        task.result_sha256 = await run_in_threadpool(file_sha256, task.result_path)
+        await db.commit()
+
+    return result_response(request, task.result_path, task.result_sha256)
+
+
+@app.api_route("/tasks/{task_id}/outputs/{name}", methods=["GET", "HEAD"])
+async def download_task_output(task_id: str, name: str, request: Request,
+                               db: AsyncSession = Depends(get_async_db)):
+    """Result of pipeline `name` of a multi-config task"""
+    task = await get_task_or_404(db, task_id)
+    output = (task.outputs or {}).get(name)
+    if not output or output["status"] != "completed" or not os.path.exists(output["path"]):
+        raise HTTPException(status_code=404, detail=f"No output for pipeline '{name}'")
+    return result_response(request, output["path"], output["sha256"])
+
+
+@app.api_route("/tasks/{task_id}/quarantine/{operation}", methods=["GET", "HEAD"])
+async def download_quarantine(task_id: str, operation: int, request: Request,
+                              pipeline: str = None, db: AsyncSession = Depends(get_async_db)):
+    """Rows set aside by the validate operation at position `operation` (1-based)"""
+    task = await get_task_or_404(db, task_id)
+    quarantine = next((r["quarantine"] for r in task.validation_report or []
+                       if r.get("operation") == operation and r.get("pipeline") == pipeline
+                       and r.get("quarantine")), None)
+    if not quarantine or not os.path.exists(quarantine["path"]):
+        raise HTTPException(status_code=404, detail="No quarantined rows for this operation")
+    return result_response(request, quarantine["path"], quarantine["sha256"])
+
+
+@app.get("/tasks/{task_id}/trace")
+async def get_task_trace(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Spans of the task's trace: upload, configure, queue wait, each stage"""
+    task = await get_task_or_404(db, task_id)
+    if not task.trace_id:
+        raise HTTPException(status_code=404, detail="No trace recorded for this task")
+    if TRACE_UI_URL:
+        return RedirectResponse(TRACE_UI_URL.format(trace_id=task.trace_id))
+    spans = await run_in_threadpool(read_trace, task.trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not exported to a file (see TRACE_EXPORTER)")
+    return {"task_id": task_id, "trace_id": task.trace_id, "spans": summarize(spans)}
+
+
+@app.get("/tasks/{task_id}/profile")
+async def download_task_profile(task_id: str, format: str = "speedscope", db: AsyncSession = Depends(get_async_db)):
+    task = await get_task_or_404(db, task_id)
+    if not task.profile_path or not os.path.exists(task.profile_path):
+        raise HTTPException(status_code=404, detail="No profile recorded for this task")
+
+    if format == "collapsed":
+        path = task.profile_path.replace(".speedscope.json", ".collapsed.txt")
+        media_type = "text/plain"
+    else:
+        path = task.profile_path
+        media_type = "application/json"
+
+    return FileResponse(path=path, media_type=media_type, filename=os.path.basename(path))
+
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+@app.post("/references")
+async def register_reference_table(
+    name: str = Form(),
+    csv_file: UploadFile = File(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Upload (or replace) a reference table for `lookup` operations"""
+    if not NAME_PATTERN.match(name):
+        raise HTTPException(status_code=400, detail="Name may only use letters, digits, '-' and '_'")
+    if not csv_file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+
+    source_path, sha256, size = await run_in_threadpool(
+        store_reference_source, csv_file.file, name)
+
+    ref = await db.get(ReferenceTable, name)
+    if not ref:
+        ref = ReferenceTable(name=name, created_at=datetime.now())
+        db.add(ref)
+    # the previous build (if any) stays in `path` and serves lookups until
+    # the new one is ready
+    ref.original_filename = csv_file.filename
+    ref.sha256 = sha256
+    ref.size = size
+    ref.source_path = source_path
+    ref.status = "building"
+    ref.error_message = None
+    ref.updated_at = datetime.now()
+    await db.commit()
+
+    await run_in_threadpool(build_reference(name, sha256).apply_async)
+    logger.info(f"Reference table {name} uploaded ({size} bytes), building")
+    return {"name": name, "status": "building", "sha256": sha256}
+
+
+@app.get("/references")
+async def list_reference_tables(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(ReferenceTable).order_by(ReferenceTable.name))
+    return result.scalars().all()
+
+
+@app.get("/references/{name}")
+async def get_reference_table(name: str, db: AsyncSession = Depends(get_async_db)):
+    ref = await db.get(ReferenceTable, name)
+    if not ref:
+        raise HTTPException(status_code=404, detail="Reference table not found")
+    return ref
+
+
+@app.delete("/references/{name}")
+async def delete_reference_table(name: str, db: AsyncSession = Depends(get_async_db)):
+    ref = await db.get(ReferenceTable, name)
+    if not ref:
+        raise HTTPException(status_code=404, detail="Reference table not found")
+    await db.delete(ref)
+    await db.commit()
+    # workers that still map the file keep reading it until they drop it
+    await run_in_threadpool(release_tree, reference_dir(name))
+    return {"name": name, "status": "deleted"}
+
+
+@app.put("/pipelines/{name}")
+async def save_pipeline(name: str, config: ConfigSchema, db: AsyncSession = Depends(get_async_db)):
+    """Save a named configuration; files in inbox/<name>/ are processed with it"""
+    if not NAME_PATTERN.match(name):
+        raise HTTPException(status_code=400, detail="Name may only use letters, digits, '-' and '_'")
+    if config.continue_from:
+        raise HTTPException(status_code=400, detail="Saved pipelines cannot continue a specific task")
+    await resolve_pipelines(db, config)
+    check_validate_ops(config)
+    await check_lookup_tables(db, config)
+
+    pipeline = await db.get(Pipeline, name)
+    if not pipeline:
+        pipeline = Pipeline(name=name, created_at=datetime.now())
+        db.add(pipeline)
+    pipeline.config = config.model_dump()
+    pipeline.updated_at = datetime.now()
+    await db.commit()
+    await db.refresh(pipeline)
+    logger.info(f"Pipeline {name} saved")
+    return pipeline
+
+
+@app.get("/pipelines")
+async def list_pipelines(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Pipeline).order_by(Pipeline.name))
+    return result.scalars().all()
+
+
+@app.get("/pipelines/{name}")
+async def get_pipeline(name: str, db: AsyncSession = Depends(get_async_db)):
+    pipeline = await db.get(Pipeline, name)
+    if not pipeline:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return pipeline
+
+
+@app.delete("/pipelines/{name}")
+async def delete_pipeline(name: str, db: AsyncSession = Depends(get_async_db)):
+    pipeline = await db.get(Pipeline, name)
+    if not pipeline:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    await db.delete(pipeline)
+    await db.commit()
+    return {"name": name, "status": "deleted"}
+
+
+def live_progress(progress):
+    """Response fields for the progress hash the worker reports to"""
+    if not progress:
+        return {}
+    return {
+        "progress": progress["current"],
+        "celery_progress": progress["current"],
+        "celery_total": 100,
+        "celery_status": progress.get("status", ""),
+        "current_operation": progress.get("operation", ""),
+        "current_step": progress["step"],
+        "total_steps": progress["total_steps"],
+        "progress_updated": progress["updated"],
+        "pipelines": progress.get("pipelines"),
+    }
+
+
+# Celery states the progress endpoint reported when it polled the result
+# backend; the same fields are now derived from the Task row and the hash
+CELERY_STATES = {"completed": "SUCCESS", "failed": "FAILURE", "cancelled": "REVOKED"}
+
+
+def celery_fields(task_id, status, config, progress):
+    """celery_state, celery_ready, celery_result and operation_params"""
+    if status in CELERY_STATES:
+        return {"celery_state": CELERY_STATES[status], "celery_ready": True,
+                "celery_result": {"task_id": task_id, "status": status}}
+    if status != "processing" or not progress:
+        # Celery reports PENDING for messages it has not started
+        return {"celery_state": "PENDING", "celery_ready": False}
+    # step 1 is reading the file, operation i is step i + 2
+    operations = (config or {}).get("operations") or []
+    index = progress.get("step", 0) - 2
+    # a truncated string, as the worker used to put in its Celery meta
+    params = str(operations[index].get("params", {}))[:100] if 0 <= index < len(operations) else ""
+    return {"celery_state": "PROGRESS", "celery_ready": False, "operation_params": params}
 
 
 @app.get("/tasks/{task_id}/progress")
-def get_task_progress(task_id: str, db: Session = Depends(get_db)):
+async def get_task_progress(task_id: str, db: AsyncSession = Depends(get_async_db)):
     # 1. Get task from database
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    task = await get_task_or_404(db, task_id)
 
     # 2. Build response with basic task info
     response = {
@@ -254,48 +689,31 @@ def get_task_progress(task_id: str, db: Session = Depends(get_db)):
         "started_at": task.started_at.isoformat() if task.started_at else None,
         "completed_at": task.completed_at.isoformat() if task.completed_at else None,
         "result_path": task.result_path,
+        "outputs": task.outputs,
         "error_message": task.error_message,
         "celery_task_id": task.celery_task_id,
+        "execution_report": task.execution_report,
     }
 
-    # 3. If task has Celery task ID, get detailed status from Celery
-    if task.celery_task_id and task.status in ["queued", "processing"]:
+    # 3. Live progress for running tasks (one HGETALL on a small Redis
+    # hash); finished tasks are fully in the DB
+    progress = None
+    if task.status in ["queued", "processing"]:
         try:
-            from worker.src.celery_app import celery_app
-            task_result = AsyncResult(task.celery_task_id, app=celery_app)
-
-            response["celery_state"] = task_result.state
-            response["celery_ready"] = task_result.ready()
-
-            if task_result.state == 'PROGRESS':
-                progress_info = task_result.info or {}
-                response.update({
-                    "celery_progress": progress_info.get('current', 0),
-                    "celery_total": progress_info.get('total', 100),
-                    "celery_status": progress_info.get('status', ''),
-                    "current_operation": progress_info.get('operation', ''),
-                    "current_step": progress_info.get('current_step', 0),
-                    "total_steps": progress_info.get('total_steps', 0),
-                    "operation_params": progress_info.get('params', '')
-                })
-
-                # Update progress from Celery if available
-                if 'current' in progress_info:
-                    response["progress"] = progress_info['current']
-
-            elif task_result.ready():
-                response["celery_result"] = task_result.result
-
+            progress = await run_in_threadpool(read_progress, task_id)
+            response.update(live_progress(progress))
         except Exception as e:
-            logger.warning(f"Could not get Celery status: {str(e)}")
-            response["celery_error"] = str(e)
+            logger.warning(f"Could not read progress: {str(e)}")
+            response["progress_error"] = str(e)
+    # the fields this endpoint returned when it polled Celery directly
+    if task.celery_task_id:
+        response.update(celery_fields(task_id, task.status, task.config, progress))
 
-    # 4. Update database progress from Celery if needed
+    # 4. Update database progress from the worker's report if needed
     if task.status == "processing" and 'celery_progress' in response:
-        # Sync Celery progress to database
-        celery_progress = response.get('celery_progress')
-        if celery_progress and celery_progress != task.progress:
-            task.progress = celery_progress
-            db.commit()
+        celery_progress_value = response.get('celery_progress')
+        if celery_progress_value and celery_progress_value != task.progress:
+            task.progress = celery_progress_value
+            await db.commit()
 
     return response
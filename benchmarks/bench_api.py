@@ -0,0 +1,66 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import summarize
+
+
+def _roundtrip(client, csv_bytes, operations):
+    """upload -> configure (processes eagerly) -> download; returns timings"""
+    timings = {}
+
+    start = time.perf_counter()
+    response = client.post(
+        "/upload", files={"csv_file": ("bench.csv", csv_bytes, "text/csv")})
+    response.raise_for_status()
+    task_id = response.json()["taskID"]
+    timings["upload"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    response = client.put(f"/task/{task_id}", json={"operations": operations})
+    response.raise_for_status()
+    timings["configure"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    response = client.get(f"/tasks/{task_id}/download")
+    response.raise_for_status()
+    timings["download"] = time.perf_counter() - mark
+
+    timings["roundtrip"] = time.perf_counter() - start
+    return timings
+
+
+def bench_api(csv_path, rows, operations, clients=4, requests_per_client=3):
+    """
+    Drive the FastAPI endpoints with `clients` concurrent clients, each doing
+    `requests_per_client` full upload -> process -> download round trips.
+    """
+    from fastapi.testclient import TestClient
+    from src.main import app
+
+    with open(csv_path, "rb") as f:
+        csv_bytes = f.read()
+    nbytes = os.path.getsize(csv_path)
+    total = clients * requests_per_client
+
+    with TestClient(app) as client:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            runs = list(pool.map(
+                lambda _: _roundtrip(client, csv_bytes, operations), range(total)))
+        elapsed = time.perf_counter() - start
+
+    results = {}
+    for stage in ("upload", "configure", "download", "roundtrip"):
+        results[f"api.{stage}"] = summarize(
+            [run[stage] for run in runs], rows, nbytes)
+
+    # aggregate throughput across all clients, rather than per request
+    results["api.concurrent"] = {
+        "clients": clients,
+        "requests": total,
+        "rows_per_s": round(rows * total / elapsed, 2),
+        "mb_per_s": round(nbytes * total / 1024**2 / elapsed, 3),
+        "requests_per_s": round(total / elapsed, 3),
+    }
+    return results
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import subprocess
+
+from benchmarks.harness import REPO_ROOT, summarize
+
+
+# what each process has to import before it can serve its first request/task
+TARGETS = {
+    "api": "import src.main",
+    "worker_tasks": "import worker.src.tasks",
+    "celery_app": "import worker.src.celery_app",
+}
+
+
+def import_seconds(statement, env):
+    """Wall time of a fresh interpreter running `statement`, minus bare startup"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - start)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=os.path.join(REPO_ROOT, "api"),
+        capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def bench_imports(repeat=5):
+    """Cold import time of the API app and the worker modules"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([REPO_ROOT, os.path.join(REPO_ROOT, "api")])
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+    results = {}
+    for name, statement in TARGETS.items():
+        samples = [import_seconds(statement, env) for _ in range(repeat)]
+        result = summarize(samples, rows=0, nbytes=0)
+        result.update({"rows_per_s": None, "mb_per_s": None})
+        results[f"imports.{name}"] = result
+    return results
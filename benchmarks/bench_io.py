@@ -0,0 +1,25 @@
+import os
+
+from benchmarks.harness import summarize, timed
+
+
+ENGINES = ("pandas", "pyarrow")
+
+
+def bench_io(csv_path, repeat=3):
+    """MB/s of every CSV reader and writer engine on the same file"""
+    from worker.src.csv_io import read_csv, write_csv
+
+    nbytes = os.path.getsize(csv_path)
+    df, _ = read_csv(csv_path, {"reader": "pandas"})
+    out_path = os.path.join(os.path.dirname(csv_path), "io_out.csv")
+
+    results = {}
+    for engine in ENGINES:
+        samples = timed(lambda: read_csv(csv_path, {"reader": engine}), repeat)
+        results[f"io.read.{engine}"] = summarize(samples, len(df), nbytes)
+    for engine in ENGINES:
+        samples = timed(lambda: write_csv(df, out_path, {"writer": engine}), repeat)
+        results[f"io.write.{engine}"] = summarize(samples, len(df), nbytes)
+    os.remove(out_path)
+    return results
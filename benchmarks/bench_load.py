@@ -0,0 +1,155 @@
+import time
+import asyncio
+
+from benchmarks.harness import summarize
+
+DB_MODES = ("async", "sync")
+
+
+class BlockingSession:
+    """
+    The AsyncSession calls the endpoints make, answered by a sync Session on
+    the event loop thread: how the API ran before it moved to the async
+    engine, kept so the load suite can show what the move bought.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def add(self, instance):
+        self.session.add(instance)
+
+    async def execute(self, *args, **kwargs):
+        return self.session.execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return self.session.scalar(*args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return self.session.get(*args, **kwargs)
+
+    async def refresh(self, instance):
+        self.session.refresh(instance)
+
+    async def delete(self, instance):
+        self.session.delete(instance)
+
+    async def commit(self):
+        self.session.commit()
+
+    async def close(self):
+        self.session.close()
+
+
+def blocking_db(concurrency):
+    """
+    Dependency serving BlockingSessions. A request keeps its connection
+    across the endpoint's threadpool awaits, so the pool is sized to the
+    load; a smaller one would deadlock the loop rather than slow it.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from api.src.database import db_url
+
+    engine = create_engine(db_url, pool_size=concurrency, max_overflow=0)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    async def get_blocking_db():
+        db = BlockingSession(session_factory())
+        try:
+            yield db
+        finally:
+            await db.close()
+    return get_blocking_db
+
+
+async def _hammer(client, paths, total, concurrency):
+    """Issue `total` GETs cycling over `paths` with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(paths[i % len(paths)])
+            response.raise_for_status()
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return samples, time.perf_counter() - start
+
+
+def bench_load(csv_path, requests=500, concurrency=50, base_url=None, tasks=3, db_modes=DB_MODES):
+    """
+    Concurrent load on the lightweight read endpoints, which is where a
+    blocked event loop shows up first. Runs in-process through ASGI unless
+    `base_url` points at a live server (e.g. uvicorn + Postgres), once per
+    entry of `db_modes`: "async" is the API as built, "sync" swaps in a
+    blocking Session (load.read_endpoints.sync). A live server is measured
+    as whatever it runs.
+    """
+    if base_url:
+        db_modes = ("async",)
+    results = {}
+    for mode in db_modes:
+        name = "load.read_endpoints" if mode == "async" else f"load.read_endpoints.{mode}"
+        results[name] = _bench_load(csv_path, requests, concurrency, base_url, tasks, mode)
+    return results
+
+
+def _bench_load(csv_path, requests, concurrency, base_url, tasks, db_mode):
+    import httpx
+
+    with open(csv_path, "rb") as f:
+        csv_bytes = f.read()
+
+    async def run():
+        if base_url:
+            client = httpx.AsyncClient(base_url=base_url, timeout=60)
+        else:
+            from src.main import app
+            from src.async_database import get_async_db
+            if db_mode == "sync":
+                app.dependency_overrides[get_async_db] = blocking_db(concurrency)
+            else:
+                app.dependency_overrides.pop(get_async_db, None)
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        async with client:
+            paths = ["/health"]
+            for _ in range(tasks):
+                response = await client.post(
+                    "/upload", files={"csv_file": ("bench.csv", csv_bytes, "text/csv")})
+                response.raise_for_status()
+                task_id = response.json()["taskID"]
+                paths += [f"/task/{task_id}", f"/tasks/{task_id}/progress"]
+            return await _hammer(client, paths, requests, concurrency)
+
+    try:
+        samples, elapsed = asyncio.run(run())
+    finally:
+        if not base_url:
+            from src.main import app
+            app.dependency_overrides.clear()
+    result = summarize(samples, rows=0, nbytes=0)
+    result.update({
+        "db_mode": db_mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "requests_per_s": round(requests / elapsed, 2),
+        "rows_per_s": None,
+        "mb_per_s": None,
+    })
+    return result
+
+
+def db_mode_comparison(results):
+    """One line with the async and sync load numbers side by side, or None"""
+    current, sync = results.get("load.read_endpoints"), results.get("load.read_endpoints.sync")
+    if not current or not sync:
+        return None
+    speedup = current["requests_per_s"] / sync["requests_per_s"] if sync["requests_per_s"] else 0
+    return (f"load.read_endpoints async {current['requests_per_s']} req/s "
+            f"(p95 {current['p95_ms']} ms) vs sync {sync['requests_per_s']} req/s "
+            f"(p95 {sync['p95_ms']} ms): {speedup:.2f}x")
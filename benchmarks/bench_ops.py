@@ -0,0 +1,41 @@
+import os
+import pandas as pd
+
+from benchmarks.harness import summarize, timed
+
+
+def default_params(df):
+    """
+    Parameters that make each operation do real work on a `datagen` frame.
+    Operations without an entry here are skipped.
+    """
+    float_cols = [c for c in df.columns if c.startswith("float_")]
+    str_cols = [c for c in df.columns if c.startswith("str_")]
+    rules = [{"check": "unique", "column": df.columns[0]}]
+    rules += [{"check": "range", "column": c, "min": 0, "max": 200} for c in float_cols]
+    rules += [{"check": "regex", "column": c, "pattern": r"val_[0-9]+"} for c in str_cols]
+    return {
+        "remove_duplicates": {},
+        "remove_missing_rows": {"how": "any"},
+        "drop_columns": {"columns": [df.columns[-1]]},
+        "fill_missing": {"method": "mean", "columns": float_cols},
+        "validate": {"rules": rules, "action": "drop"},
+    }
+
+
+def bench_operations(csv_path, repeat=5):
+    """Time every OP_REGISTRY handler on the DataFrame read from `csv_path`"""
+    from worker.src.tasks import OP_REGISTRY
+
+    df = pd.read_csv(csv_path)
+    nbytes = os.path.getsize(csv_path)
+    params = default_params(df)
+
+    results = {}
+    for op_name, handler in OP_REGISTRY.items():
+        if op_name not in params:
+            continue
+        samples = timed(lambda frame: handler(frame, dict(params[op_name])),
+                        repeat, setup=df.copy)
+        results[f"ops.{op_name}"] = summarize(samples, len(df), nbytes)
+    return results
@@ -0,0 +1,74 @@
+import os
+import uuid
+import shutil
+from datetime import datetime
+
+from benchmarks.harness import summarize, timed
+
+
+def pipelines(columns):
+    """Named pipelines run end to end through process_csv_task"""
+    float_cols = [c for c in columns if c.startswith("float_")]
+    return {
+        "dedupe": [
+            {"op": "remove_duplicates", "params": {}},
+        ],
+        "cleanup": [
+            {"op": "remove_duplicates", "params": {}},
+            {"op": "fill_missing", "params": {"method": "mean", "columns": float_cols}},
+            {"op": "remove_missing_rows", "params": {"how": "any"}},
+            {"op": "drop_columns", "params": {"columns": [columns[-1]]}},
+        ],
+    }
+
+
+def _create_task(csv_path, config):
+    from api.src.database import SessionLocal
+    from shared.db_models import Task
+
+    task_id = str(uuid.uuid4())
+    file_path = os.path.join("uploads", f"{task_id}.csv")
+    shutil.copyfile(csv_path, file_path)
+
+    db = SessionLocal()
+    try:
+        db.add(Task(
+            id=task_id,
+            filename=f"{task_id}.csv",
+            original_filename=f"bench_{task_id}.csv",
+            status="queued",
+            file_path=file_path,
+            config=config,
+            created_at=datetime.now(),
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return task_id
+
+
+def bench_pipelines(csv_path, rows, columns, repeat=3):
+    """
+    Run each named pipeline through the eager Celery task, then all of them
+    as one multi-config task; compare pipeline.shared_scan with the sum of
+    the others to see what the shared read saves.
+    """
+    from worker.src.tasks import process_csv_task
+
+    nbytes = os.path.getsize(csv_path)
+    results = {}
+    for name, operations in pipelines(columns).items():
+        samples = timed(
+            lambda task_id: process_csv_task.apply(args=[task_id], throw=True),
+            repeat,
+            setup=lambda: _create_task(csv_path, {"operations": operations}),
+        )
+        results[f"pipeline.{name}"] = summarize(samples, rows, nbytes)
+
+    samples = timed(
+        lambda task_id: process_csv_task.apply(args=[task_id], throw=True),
+        repeat,
+        setup=lambda: _create_task(csv_path, {"pipelines": pipelines(columns)}),
+    )
+    results["pipeline.shared_scan"] = summarize(samples, rows, nbytes)
+    return results
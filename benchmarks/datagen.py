@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+DTYPES = ("int", "float", "str", "date")
+
+
+def make_dataframe(rows=100_000, width=8, dtypes=DTYPES,
+                   null_ratio=0.05, duplicate_ratio=0.05, seed=42):
+    """
+    Build a synthetic DataFrame for benchmarking.
+
+    Columns cycle through `dtypes` and are named after their type
+    (int_0, float_1, str_2, ...). `null_ratio` of the cells in every
+    column except the first are blanked, and `duplicate_ratio` of the rows
+    are exact copies of earlier rows.
+    """
+    rng = np.random.default_rng(seed)
+    unique_rows = max(1, rows - int(rows * duplicate_ratio))
+
+    data = {}
+    for i in range(width):
+        kind = dtypes[i % len(dtypes)]
+        name = f"{kind}_{i}"
+        if kind == "int":
+            values = rng.integers(0, 1_000_000, unique_rows)
+        elif kind == "float":
+            values = rng.normal(100, 25, unique_rows).round(4)
+        elif kind == "str":
+            values = np.char.add("val_", rng.integers(0, 50_000, unique_rows).astype(str))
+        elif kind == "date":
+            values = pd.to_datetime("2024-01-01") + pd.to_timedelta(
+                rng.integers(0, 365 * 24 * 3600, unique_rows), unit="s")
+        else:
+            raise ValueError(f"Unknown dtype '{kind}'")
+        data[name] = values
+
+    df = pd.DataFrame(data)
+
+    # Blank a fraction of the cells (the first column stays complete so it
+    # can be used as a key)
+    if null_ratio > 0:
+        for col in df.columns[1:]:
+            mask = rng.random(unique_rows) < null_ratio
+            df[col] = df[col].mask(mask)
+
+    if rows > unique_rows:
+        dupes = df.sample(n=rows - unique_rows, replace=True, random_state=seed)
+        df = pd.concat([df, dupes], ignore_index=True)
+        df = df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    return df
+
+
+def generate_csv(path, **kwargs):
+    """Write a synthetic CSV to `path` and return a small description of it"""
+    df = make_dataframe(**kwargs)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df.to_csv(path, index=False)
+    return {
+        "path": path,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "bytes": os.path.getsize(path),
+    }
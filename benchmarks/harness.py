@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import resource
+import numpy as np
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_environment(workdir):
+    """
+    Point the services at a throwaway SQLite database (or BENCH_DATABASE_URL)
+    and run Celery eagerly.
+
+    Must be called before anything imports `api.src` or `worker.src`,
+    because the database engine is created from DATABASE_URL at import time.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    # BENCH_DATABASE_URL runs against a real server instead (the load suite's
+    # sync/async comparison only means much over a network)
+    os.environ["DATABASE_URL"] = (os.getenv("BENCH_DATABASE_URL")
+                                  or f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+
+    # the API is written to run from inside api/ (`src.database`), the
+    # worker from the repo root (`worker.src.tasks`)
+    for path in (REPO_ROOT, os.path.join(REPO_ROOT, "api")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    # uploads/ and output/ are relative to the working directory
+    os.chdir(workdir)
+    os.makedirs("uploads", exist_ok=True)
+    os.makedirs("output", exist_ok=True)
+
+    from worker.src.celery_app import celery_app
+    celery_app.conf.update(
+        task_always_eager=True,
+        task_eager_propagates=True,
+        result_backend="cache+memory://",
+    )
+
+    # the API enqueues by task name; eager mode needs the task registered
+    import worker.src.tasks  # noqa: F401
+
+    from api.src.database import engine
+    from shared.db_models import Base
+    Base.metadata.create_all(bind=engine)
+
+
+def peak_rss_mb():
+    """High-water mark of this process' resident set size"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    if sys.platform == "darwin":
+        return round(usage / 1024**2, 2)
+    return round(usage / 1024, 2)
+
+
+def summarize(samples, rows, nbytes):
+    """
+    Turn a list of wall-clock samples (seconds) for processing `rows` rows /
+    `nbytes` bytes into throughput and latency numbers.
+    """
+    samples = np.asarray(samples)
+    median = float(np.median(samples))
+    return {
+        "runs": len(samples),
+        "rows": rows,
+        "bytes": nbytes,
+        "rows_per_s": round(rows / median, 2) if median else None,
+        "mb_per_s": round(nbytes / 1024**2 / median, 3) if median else None,
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def timed(fn, repeat, setup=None):
+    """
+    Call `fn` `repeat` times and return the wall-clock samples. When `setup`
+    is given it runs untimed before each call and its return value is passed
+    to `fn`.
+    """
+    samples = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
@@ -0,0 +1,174 @@
+"""
+End-to-end benchmark runner.
+
+    python -m benchmarks.run --rows 200000 --out bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+
+Results are written as JSON. When --baseline is given, every throughput
+number is compared to the stored one and the process exits with status 1
+if any of them dropped by more than --tolerance.
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+from benchmarks.harness import setup_environment
+from benchmarks.datagen import generate_csv, DTYPES
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of regressions: lower throughput or higher p95 latency than
+    the baseline by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        current = results.get(name)
+        if not current:
+            continue
+        for metric in ("rows_per_s", "mb_per_s", "requests_per_s"):
+            if base.get(metric) and current.get(metric) is not None:
+                if current[metric] < base[metric] * (1 - tolerance):
+                    regressions.append(
+                        f"{name}.{metric}: {current[metric]} < baseline {base[metric]}")
+        if base.get("p95_ms") and current.get("p95_ms") is not None:
+            if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}.p95_ms: {current['p95_ms']} > baseline {base['p95_ms']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CSV processor benchmarks")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--dtypes", default=",".join(DTYPES),
+                        help="comma separated column types to cycle through")
+    parser.add_argument("--null-ratio", type=float, default=0.05)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    parser.add_argument("--suites", default="io,ops,pipeline,api,load,imports",
+                        help="comma separated subset of io,ops,pipeline,api,load,imports")
+    parser.add_argument("--load-requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-mode", default="both", choices=["both", "async", "sync"],
+                        help="database path(s) the load suite measures in-process")
+    parser.add_argument("--base-url", default=None,
+                        help="run the load suite against a live server instead of in-process")
+    parser.add_argument("--workdir", default=None,
+                        help="where uploads/, output/ and the SQLite db live")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    suites = set(args.suites.split(","))
+    # paths given on the command line are relative to where we were started,
+    # not to the workdir we chdir into
+    out = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_baseline = os.path.abspath(args.save_baseline) if args.save_baseline else None
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="csv-bench-")
+    setup_environment(os.path.abspath(workdir))
+
+    data = generate_csv(
+        os.path.join("bench_input", "input.csv"),
+        rows=args.rows,
+        width=args.width,
+        dtypes=tuple(args.dtypes.split(",")),
+        null_ratio=args.null_ratio,
+        duplicate_ratio=args.duplicate_ratio,
+    )
+    print(f"Generated {data['rows']} rows x {data['columns']} columns "
+          f"({data['bytes'] / 1024**2:.1f} MB) in {workdir}")
+
+    import pandas as pd
+    columns = list(pd.read_csv(data["path"], nrows=0).columns)
+
+    results = {}
+    if "io" in suites:
+        from benchmarks.bench_io import bench_io
+        results.update(bench_io(data["path"], repeat=args.repeat))
+    if "ops" in suites:
+        from benchmarks.bench_ops import bench_operations
+        results.update(bench_operations(data["path"], repeat=args.repeat))
+    if "pipeline" in suites:
+        from benchmarks.bench_pipeline import bench_pipelines
+        results.update(bench_pipelines(
+            data["path"], data["rows"], columns, repeat=args.repeat))
+    if "api" in suites:
+        from benchmarks.bench_api import bench_api
+        from benchmarks.bench_pipeline import pipelines
+        results.update(bench_api(
+            data["path"], data["rows"], pipelines(columns)["cleanup"],
+            clients=args.clients, requests_per_client=args.requests_per_client))
+
+    if "load" in suites:
+        from benchmarks.bench_load import bench_load, DB_MODES
+        results.update(bench_load(
+            data["path"], requests=args.load_requests,
+            concurrency=args.concurrency, base_url=args.base_url,
+            db_modes=DB_MODES if args.db_mode == "both" else (args.db_mode,)))
+
+    if "imports" in suites:
+        from benchmarks.bench_imports import bench_imports
+        results.update(bench_imports(repeat=args.repeat))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": {k: v for k, v in data.items() if k != "path"},
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    for name, result in results.items():
+        print(f"{name:32} {result.get('rows_per_s') or '-':>14} rows/s "
+              f"{result.get('mb_per_s') or '-':>10} MB/s "
+              f"{result.get('requests_per_s') or '-':>10} req/s "
+              f"p95 {result.get('p95_ms') or '-':>10} ms")
+    from benchmarks.bench_load import db_mode_comparison
+    comparison = db_mode_comparison(results)
+    if comparison:
+        report["comparisons"] = [comparison]
+        print(comparison)
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+    if save_baseline:
+        with open(save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {save_baseline}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
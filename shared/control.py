@@ -0,0 +1,43 @@
+import os
+
+
+# Out-of-band signals for running tasks. The API sets a key, the worker polls
+# it between pipeline stages. Redis is already shared by both services.
+SIGNAL_TTL = 24 * 60 * 60
+CANCEL = "cancel"
+PREEMPT = "preempt"
+
+# Celery's Redis transport treats 0 as the highest priority
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+    return _client
+
+
+def _key(task_id):
+    return f"csv:signal:{task_id}"
+
+
+def request_cancel(task_id):
+    get_redis().set(_key(task_id), CANCEL, ex=SIGNAL_TTL)
+
+
+def request_preempt(task_id):
+    # never downgrade a pending cancel to a preempt
+    get_redis().set(_key(task_id), PREEMPT, ex=SIGNAL_TTL, nx=True)
+
+
+def pending_signal(task_id):
+    return get_redis().get(_key(task_id))
+
+
+def clear_signal(task_id):
+    get_redis().delete(_key(task_id))
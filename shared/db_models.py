@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Text, String, DateTime
+from sqlalchemy import (
+    Column, Text, String, DateTime, JSON, BigInteger, UniqueConstraint, inspect, text
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
 import uuid
@@ -14,19 +16,159 @@ class Task(Base):
     filename = Column(String)
     original_filename = Column(String)
     file_path = Column(String)
+    upload_sha256 = Column(String, nullable=True, index=True)  # dedup blob key
+    upload_size = Column(BigInteger, nullable=True)
+    # who uploaded it (peer address or CLIENT_ID_HEADER), for per-client limits
+    client_id = Column(String, nullable=True, index=True)
 
-    config = Column(JSONB, nullable=True)
+    config = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     status = Column(String)  # pending, processing, completed, failed
     progress = Column(String, nullable=True)
 
     created_at = Column(DateTime, default=datetime.now())
     started_at = Column(DateTime, nullable=True)
+    # last time the task was put on the broker; storage_gc fails tasks that
+    # stay queued or processing without progress long after this
+    queued_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    purged_at = Column(DateTime, nullable=True)  # files reclaimed by storage_gc
 
     result_path = Column(String, nullable=True)
+    result_sha256 = Column(String, nullable=True)  # strong ETag for downloads
+    result_size = Column(BigInteger, nullable=True)
     error_message = Column(Text, nullable=True)
 
     celery_task_id = Column(String, nullable=True)
+    # checkpoint path and next operation index left by a preempted run
+    resume_state = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+
+    # per-stage timings, memory and row counts written by the worker
+    execution_report = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    # speedscope JSON written when the task ran under the sampling profiler
+    profile_path = Column(String, nullable=True)
+    # continue mode: byte offset, source fingerprint and per-operation state
+    # (dedup hashes, running sums) a later task on the same source resumes from
+    delta_state = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    # `validate` operations: violation counts per rule, a bounded sample of
+    # failing rows and the quarantine file, one entry per operation
+    validation_report = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    # multi-config tasks: pipeline name -> {status, path, sha256, size, rows}
+    # or {status, error}; result_path stays empty
+    outputs = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    # W3C traceparent of the span that created the task; the worker's spans
+    # join the same trace
+    traceparent = Column(String, nullable=True)
+
+    @property
+    def trace_id(self):
+        return self.traceparent.split("-")[1] if self.traceparent else None
 
     def __repr__(self):
         return f"<Task(id={self.id}, filename={self.filename}, status={self.status})"
+
+
+class ReferenceTable(Base):
+    """A CSV registered once for `lookup` operations, stored as an Arrow file"""
+    __tablename__ = "reference_tables"
+
+    name = Column(String, primary_key=True)
+    original_filename = Column(String)
+    sha256 = Column(String)  # latest upload; `path` may still be the previous build
+    size = Column(BigInteger, nullable=True)
+    source_path = Column(String, nullable=True)  # CSV awaiting conversion
+
+    status = Column(String)  # building, ready, failed
+    path = Column(String, nullable=True)  # Arrow IPC file the workers map
+    rows = Column(BigInteger, nullable=True)
+    columns = Column(JSON, nullable=True)
+    error_message = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ReferenceTable(name={self.name}, status={self.status})"
+
+
+class Pipeline(Base):
+    """A named, saved task configuration (ConfigSchema) used by the inbox"""
+    __tablename__ = "pipelines"
+
+    name = Column(String, primary_key=True)
+    config = Column(JSON().with_variant(JSONB(), "postgresql"))
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Pipeline(name={self.name})"
+
+
+class InboxFile(Base):
+    """
+    Ledger of files picked up from the inbox. The unique key is the file's
+    identity at pickup time; inserting the row is the claim, so a file is
+    ingested once even when two scans overlap.
+    """
+    __tablename__ = "inbox_files"
+    __table_args__ = (UniqueConstraint("pipeline", "name", "size", "mtime_ns"),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    pipeline = Column(String, index=True)
+    name = Column(String)
+    size = Column(BigInteger)
+    mtime_ns = Column(BigInteger)
+
+    status = Column(String)  # claimed, ingested
+    task_id = Column(String, nullable=True)
+    claimed_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<InboxFile(pipeline={self.pipeline}, name={self.name}, status={self.status})"
+
+
+# Columns added to existing tables after the first release. create_all never
+# alters a table that already exists, so add_missing_columns adds these on
+# start; a change that adds a column to an existing table lists it here.
+ADDED_COLUMNS = [
+    ("tasks", "execution_report"),
+    ("tasks", "profile_path"),
+    ("tasks", "result_sha256"),
+    ("tasks", "result_size"),
+    ("tasks", "resume_state"),
+    ("tasks", "upload_sha256"),
+    ("tasks", "upload_size"),
+    ("tasks", "purged_at"),
+    ("tasks", "queued_at"),
+    ("tasks", "delta_state"),
+    ("tasks", "traceparent"),
+    ("tasks", "client_id"),
+    ("tasks", "validation_report"),
+    ("tasks", "outputs"),
+]
+
+
+def add_missing_columns(connection):
+    """
+    Add the ADDED_COLUMNS a database doesn't have yet, with their indexes.
+    Only nullable columns are handled, which is all this schema adds. Safe
+    to run on every start; run after create_all.
+    """
+    inspector = inspect(connection)
+    # several API replicas may start at once
+    guard = "IF NOT EXISTS " if connection.dialect.name == "postgresql" else ""
+    existing = {}
+    added = []
+    for table_name, column_name in ADDED_COLUMNS:
+        if table_name not in existing:
+            existing[table_name] = {c["name"] for c in inspector.get_columns(table_name)}
+        if column_name in existing[table_name]:
+            continue
+        column = Base.metadata.tables[table_name].columns[column_name]
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(text(
+            f'ALTER TABLE {table_name} ADD COLUMN {guard}{column_name} {column_type}'))
+        added.append(column)
+    for table in {column.table for column in added}:
+        for index in table.indexes:
+            if any(column in added for column in index.columns):
+                index.create(connection, checkfirst=True)
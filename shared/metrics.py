@@ -0,0 +1,75 @@
+import os
+from prometheus_client import (
+    Histogram, Counter, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+)
+from prometheus_client import multiprocess
+
+
+# Celery prefork children each keep their own counters. When
+# PROMETHEUS_MULTIPROC_DIR is set, prometheus_client writes every process'
+# values to files in that directory and the exporter merges them.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# ---------- worker ----------
+STAGE_SECONDS = Histogram(
+    "csv_stage_seconds",
+    "Wall time of one pipeline stage (read, an operation, or write)",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+STAGE_CPU_SECONDS = Histogram(
+    "csv_stage_cpu_seconds",
+    "CPU time of one pipeline stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+STAGE_ROWS = Histogram(
+    "csv_stage_rows_in",
+    "Rows fed into one pipeline stage",
+    ["stage"],
+    buckets=(100, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+)
+STAGE_MEMORY_BYTES = Histogram(
+    "csv_stage_peak_memory_delta_bytes",
+    "Peak RSS of one pipeline stage above the RSS it started with",
+    ["stage"],
+    buckets=(0, 1024**2, 16 * 1024**2, 128 * 1024**2, 1024**3, 4 * 1024**3),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "csv_queue_wait_seconds",
+    "Time from publishing a task to a worker starting it (broker + free slot)",
+    ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+TASK_SECONDS = Histogram(
+    "csv_task_seconds",
+    "Wall time of a whole process_csv_task run",
+    ["status"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800),
+)
+
+# ---------- api ----------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "API request latency",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "API requests served",
+    ["method", "route", "status"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections",
+    "Uploads and task submissions refused by admission control",
+    ["reason"],
+)
+
+
+def render_metrics():
+    """Return (payload, content_type) for a Prometheus scrape"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,60 @@
+import time
+
+from shared.control import get_redis
+
+
+# Live progress of a running task as one small Redis hash, written with a
+# single pipelined round trip and read with one HGETALL. Finished tasks keep
+# their final state in Postgres, so the hash only needs to outlive polling.
+PROGRESS_TTL = 6 * 60 * 60
+FINISHED_TTL = 5 * 60
+
+
+def _key(task_id):
+    return f"csv:progress:{task_id}"
+
+
+# multi-config tasks add one "pipeline:<name>" field (percent) per pipeline
+PIPELINE_FIELD = "pipeline:"
+
+
+def write_progress(task_id, current, status, operation="", step=0, total_steps=0,
+                   ttl=PROGRESS_TTL, pipelines=None):
+    fields = {
+        "current": int(current),
+        "status": status[:120],
+        "operation": operation[:60],
+        "step": int(step),
+        "total_steps": int(total_steps),
+        "updated": int(time.time()),
+    }
+    for name, percent in (pipelines or {}).items():
+        fields[PIPELINE_FIELD + name] = int(percent)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hset(_key(task_id), mapping=fields)
+    pipe.expire(_key(task_id), ttl)
+    pipe.execute()
+
+
+def finish_progress(task_id, status):
+    """Final update; the hash expires shortly after since the DB has the rest"""
+    write_progress(task_id, 100, status, ttl=FINISHED_TTL)
+
+
+def read_progress(task_id):
+    """Return the progress dict, or None when nothing has been reported"""
+    data = get_redis().hgetall(_key(task_id))
+    if not data:
+        return None
+    for field in ("current", "step", "total_steps", "updated"):
+        data[field] = int(data.get(field) or 0)
+    pipelines = {field[len(PIPELINE_FIELD):]: int(data.pop(field))
+                 for field in list(data) if field.startswith(PIPELINE_FIELD)}
+    if pipelines:
+        data["pipelines"] = pipelines
+    return data
+
+
+def clear_progress(task_id):
+    get_redis().delete(_key(task_id))
+
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+import re
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Literal, Union
 from enum import Enum
 from datetime import datetime
 
@@ -12,8 +13,92 @@ class TaskStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+CsvEngine = Literal["pyarrow", "pandas"]
+CsvDtype = Literal["int64", "float64", "string", "bool", "category", "datetime"]
+
+
+class CsvOptions(BaseModel):
+    reader: Optional[CsvEngine] = None  # None: CSV_READ_ENGINE
+    writer: Optional[CsvEngine] = None  # None: CSV_WRITE_ENGINE
+    delimiter: str = ","
+    encoding: str = "utf-8"
+    dtypes: dict[str, CsvDtype] = {}  # column -> type, skips inference
+
+
+class ValidationRule(BaseModel):
+    check: Literal["not_null", "regex", "range", "allowed", "unique"]
+    column: Optional[str] = None
+    columns: Optional[list[str]] = None  # not_null / unique over several
+    pattern: Optional[str] = None  # regex: must match the whole value
+    min: Optional[float] = None  # range: inclusive bounds
+    max: Optional[float] = None
+    values: Optional[list] = None  # allowed
+    name: Optional[str] = None  # defaults to "<check>:<columns>"
+
+    @model_validator(mode="after")
+    def check_arguments(self):
+        if not (self.column or self.columns):
+            raise ValueError("a rule needs `column` or `columns`")
+        if self.check == "regex":
+            if not self.pattern:
+                raise ValueError("regex rules need `pattern`")
+            try:
+                re.compile(self.pattern)
+            except re.error as e:
+                raise ValueError(f"invalid pattern: {e}")
+        if self.check == "range" and self.min is None and self.max is None:
+            raise ValueError("range rules need `min` and/or `max`")
+        if self.check == "allowed" and not self.values:
+            raise ValueError("allowed rules need `values`")
+        return self
+
+
+class ValidateParams(BaseModel):
+    """params of the `validate` operation"""
+    rules: list[ValidationRule] = Field(min_length=1, max_length=64)
+    action: Literal["report", "drop", "quarantine"] = "report"
+    sample_size: int = Field(20, ge=0, le=1000)
+
+
+# names of the pipelines of a multi-config task; they become file names
+PIPELINE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+MAX_PIPELINES = 8
+
+
 class ConfigSchema(BaseModel):
-    operations: list
+    operations: list = []
+    # multi-config: several named operation lists (or names of saved
+    # pipelines) run against one read of the upload, each with its own output
+    pipelines: dict[str, Union[list, str]] = {}
+    profile: bool = False  # run under the sampling profiler
+    priority: Literal["high", "normal", "low"] = "normal"
+    csv: CsvOptions = CsvOptions()
+    # continue mode: record where this run stopped, or only process the
+    # bytes appended since an earlier run on the same source
+    incremental: bool = False
+    continue_from: Optional[str] = None  # task id of the previous run
+    delta_output: Literal["delta", "append"] = "delta"
+
+    @model_validator(mode="after")
+    def check_pipelines(self):
+        if not self.pipelines:
+            if "operations" not in self.model_fields_set:
+                raise ValueError("`operations` or `pipelines` is required")
+            return self
+        if self.operations:
+            raise ValueError("give either `operations` or `pipelines`, not both")
+        if len(self.pipelines) > MAX_PIPELINES:
+            raise ValueError(f"at most {MAX_PIPELINES} pipelines per task")
+        bad = [name for name in self.pipelines if not PIPELINE_NAME.match(name)]
+        if bad:
+            raise ValueError(f"pipeline names may only use letters, digits, '-' and '_': {bad}")
+        if self.incremental or self.continue_from:
+            raise ValueError("continue mode runs a single pipeline")
+        return self
+
+    def operation_lists(self):
+        """(pipeline name, operations) per pipeline; name None for a plain task"""
+        return list(self.pipelines.items()) or [(None, self.operations)]
 
 
 # class Task(BaseModel):
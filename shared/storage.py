@@ -0,0 +1,181 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+
+
+CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_DIR = "uploads"
+OUTPUT_DIR = "output"
+# Uploads are stored once per content hash under blobs/ and every task gets
+# a hardlink to its blob at uploads/{task_id}.csv. The inode's link count is
+# the reference count: a blob with st_nlink == 1 is referenced by no task.
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+# registered lookup tables: references/<name>/<sha256>.arrow
+REFERENCE_DIR = os.path.join(UPLOAD_DIR, "references")
+
+# big files are shrunk in steps before the final unlink, so freeing a 10 GB
+# result doesn't hold the filesystem journal for one long operation
+TRUNCATE_STEP = 256 * 1024 * 1024
+TRUNCATE_PAUSE = 0.05
+
+
+def file_sha256(path):
+    """Hex sha256 of a file, read in 1 MiB chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(sha256):
+    return os.path.join(BLOB_DIR, sha256[:2], f"{sha256}.csv")
+
+
+def _stream_to_temp(fileobj):
+    """Copy `fileobj` to a temp file in 1 MiB chunks; returns (path, sha256, size)"""
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    with open(tmp_path, "wb") as out:
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return tmp_path, digest.hexdigest(), size
+
+
+def store_upload(fileobj, task_id):
+    """
+    Stream an upload to disk while hashing it, dedupe it against existing
+    blobs and link it to uploads/{task_id}.csv.
+
+    Returns (file_path, sha256, size).
+    """
+    tmp_path, sha256, size = _stream_to_temp(fileobj)
+
+    blob = blob_path(sha256)
+    file_path = os.path.join(UPLOAD_DIR, f"{task_id}.csv")
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+    if os.path.exists(blob):
+        try:
+            os.link(blob, file_path)
+            os.remove(tmp_path)
+            return file_path, sha256, size
+        except FileNotFoundError:
+            pass  # collected between the check and the link; store it again
+        except OSError:
+            # filesystems without hardlinks get a private copy (no dedup)
+            os.replace(tmp_path, file_path)
+            return file_path, sha256, size
+
+    os.replace(tmp_path, blob)
+    try:
+        os.link(blob, file_path)
+    except OSError:
+        shutil.copyfile(blob, file_path)
+    return file_path, sha256, size
+
+
+def result_dir(task_id):
+    return os.path.join(OUTPUT_DIR, task_id)
+
+
+def result_path(task_id, original_filename):
+    """Per-task result location; keeps the friendly download name"""
+    return os.path.join(result_dir(task_id), f"processed_{original_filename}")
+
+
+def output_path(task_id, pipeline, original_filename):
+    """Result of one named pipeline of a multi-config task"""
+    return os.path.join(result_dir(task_id), f"{pipeline}_{original_filename}")
+
+
+def reference_dir(name):
+    return os.path.join(REFERENCE_DIR, name)
+
+
+def reference_path(name, sha256, suffix=".arrow"):
+    """Versioned by content, so a re-upload never overwrites a mapped file"""
+    return os.path.join(reference_dir(name), f"{sha256}{suffix}")
+
+
+def store_reference_source(fileobj, name):
+    """Stream a reference CSV next to its tables; returns (path, sha256, size)"""
+    tmp_path, sha256, size = _stream_to_temp(fileobj)
+    path = reference_path(name, sha256, ".csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    return path, sha256, size
+
+
+def release_file(path, pause=TRUNCATE_PAUSE):
+    """
+    Delete `path` and return the number of bytes actually freed (0 while
+    other hardlinks still reference the data).
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0
+
+    if st.st_nlink > 1:
+        os.remove(path)
+        return 0
+
+    # last link: shrink it gradually, then unlink
+    size = st.st_size
+    if size > TRUNCATE_STEP:
+        remaining = size
+        while remaining > TRUNCATE_STEP:
+            remaining -= TRUNCATE_STEP
+            os.truncate(path, remaining)
+            time.sleep(pause)
+    os.remove(path)
+    return size
+
+
+def release_tree(path, pause=TRUNCATE_PAUSE):
+    """release_file() every file under `path`, then remove the directories"""
+    if not os.path.isdir(path):
+        return release_file(path, pause)
+    freed = 0
+    for root, _, files in os.walk(path, topdown=False):
+        for name in files:
+            freed += release_file(os.path.join(root, name), pause)
+        os.rmdir(root)
+    return freed
+
+
+def orphan_blobs(grace_seconds=60 * 60):
+    """
+    Blobs no task links to any more. Blobs whose inode changed within
+    `grace_seconds` are skipped: an upload may be about to link them.
+    """
+    if not os.path.isdir(BLOB_DIR):
+        return
+    cutoff = time.time() - grace_seconds
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            if st.st_nlink == 1 and st.st_ctime < cutoff:
+                yield path
+
+
+def stale_temp_files(max_age_seconds=24 * 60 * 60):
+    """Upload temp files left behind by a crashed or aborted request"""
+    if not os.path.isdir(TMP_DIR):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(TMP_DIR):
+        path = os.path.join(TMP_DIR, name)
+        if os.stat(path).st_mtime < cutoff:
+            yield path
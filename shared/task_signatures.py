@@ -0,0 +1,24 @@
+from worker.src.celery_app import celery_app
+
+# Tasks are referenced by name so the API can enqueue work without importing
+# worker.src.tasks, which pulls in pandas and every operation handler.
+# worker.src.celery_app only holds the Celery configuration.
+
+
+def process_csv(task_id, priority=None):
+    """Signature for process_csv_task; call .apply_async() to enqueue it"""
+    return celery_app.signature("process_csv_task", args=[task_id], priority=priority)
+
+
+def process_csv_batch(task_ids, priority=None):
+    """Signature for process_csv_batch: several small tasks in one job"""
+    return celery_app.signature("process_csv_batch", args=[task_ids], priority=priority)
+
+
+def build_reference(name, sha256):
+    """Signature for build_reference_table (CSV -> memory-mappable Arrow file)"""
+    return celery_app.signature("build_reference_table", args=[name, sha256])
+
+
+def revoke(celery_task_id):
+    celery_app.control.revoke(celery_task_id)
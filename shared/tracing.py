@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import time
+import secrets
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+
+from loguru import logger
+
+from shared.storage import OUTPUT_DIR
+
+
+# Minimal distributed tracing: W3C `traceparent` context, carried from the
+# API into the Celery message headers, with spans exported as OTLP/JSON.
+#
+#   file  - one JSON line per span in output/traces/<trace_id>.jsonl, served
+#           by GET /tasks/<id>/trace (the default)
+#   otlp  - POST to an OpenTelemetry collector at OTEL_EXPORTER_OTLP_ENDPOINT
+#   none  - context is still propagated, nothing is recorded
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")
+TRACE_DIR = os.path.join(OUTPUT_DIR, "traces")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+OTLP_TIMEOUT = 2
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_service = os.getenv("OTEL_SERVICE_NAME", "csv-processor")
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def set_service_name(name):
+    """Called once per process type (API, worker) to label its spans"""
+    global _service
+    _service = os.getenv("OTEL_SERVICE_NAME", name)
+
+
+def parse_traceparent(value):
+    """(trace_id, span_id) from a traceparent header, or None if malformed"""
+    match = TRACEPARENT.match(value or "")
+    return match.groups() if match else None
+
+
+def trace_id_of(traceparent):
+    parsed = parse_traceparent(traceparent)
+    return parsed[0] if parsed else None
+
+
+class Span:
+    """
+    One timed unit of work. Spans ended in this process are buffered with
+    their local root and exported together when it ends, so a request or a
+    task costs one write (or one POST) rather than one per span.
+
+    Usage:
+        span = begin_span("process_csv_task", parent=traceparent)
+        ...
+        span.end()
+    or:
+        with start_span("read", rows=10):
+            ...
+    """
+
+    def __init__(self, name, trace_id, parent_id, buffer, attributes, start_ns=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.service = _service
+        # spans of this trace ended in this process; None for the local root
+        # until it ends (it owns the list)
+        self.local_root = buffer is None
+        self.buffer = [] if buffer is None else buffer
+        self._token = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error=None, end_ns=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:200]
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        self.buffer.append(self.to_dict())
+        if self.local_root:
+            export(self.buffer)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def begin_span(name, parent=None, start_ns=None, **attributes):
+    """
+    Start a span and make it current. `parent` is a Span, a traceparent
+    string, or None for the current span (a new trace if there is none).
+    """
+    if parent is None:
+        parent = _current.get()
+    if isinstance(parent, Span):
+        span = Span(name, parent.trace_id, parent.span_id, parent.buffer, attributes, start_ns)
+    else:
+        trace_id, parent_id = parse_traceparent(parent) or (secrets.token_hex(16), None)
+        span = Span(name, trace_id, parent_id, None, attributes, start_ns)
+    span._token = _current.set(span)
+    return span
+
+
+@contextmanager
+def start_span(name, parent=None, **attributes):
+    span = begin_span(name, parent, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        span.end(error=e)
+        raise
+    span.end()
+
+
+def record_span(name, start_ns, end_ns, parent=None, **attributes):
+    """Add a span that already happened (e.g. time spent waiting in the queue)"""
+    span = begin_span(name, parent, start_ns=start_ns, **attributes)
+    span.end(end_ns=end_ns)
+    return span
+
+
+def inject(headers=None):
+    """Celery headers carrying the current trace context and the enqueue time"""
+    headers = dict(headers or {})
+    span = _current.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+    headers["enqueued_at"] = time.time()
+    return headers
+
+
+def message_header(request, key):
+    """A custom header of the running Celery task, eager or from a broker"""
+    headers = getattr(request, "headers", None) or {}
+    return headers.get(key, getattr(request, key, None))
+
+
+# ---------- export ----------
+
+def trace_path(trace_id):
+    return os.path.join(TRACE_DIR, f"{trace_id}.jsonl")
+
+
+def export(spans):
+    if not spans or TRACE_EXPORTER == "none":
+        return
+    try:
+        if TRACE_EXPORTER == "otlp":
+            # never hold up a request or task on the collector
+            threading.Thread(target=_post_otlp, args=(list(spans),), daemon=True).start()
+        else:
+            _write_file(spans)
+    except Exception as e:
+        logger.warning(f"Could not export {len(spans)} spans: {e}")
+
+
+def _write_file(spans):
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    # one append per local root; API and worker processes append to the same
+    # file, each write a few KB of whole lines
+    payload = "".join(json.dumps(span) + "\n" for span in spans)
+    with open(trace_path(spans[0]["trace_id"]), "a") as f:
+        f.write(payload)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans):
+    """OTLP/JSON ExportTraceServiceRequest for spans of one service"""
+    otlp_spans = []
+    for span in spans:
+        otlp_spans.append({
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "parentSpanId": span["parent_id"] or "",
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(span["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)}
+                           for k, v in span["attributes"].items() if v is not None],
+            "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+        })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": spans[0]["service"]}}]},
+        "scopeSpans": [{"scope": {"name": "csv-processor"}, "spans": otlp_spans}],
+    }]}
+
+
+def _post_otlp(spans):
+    request = urllib.request.Request(
+        OTLP_ENDPOINT.rstrip("/") + "/v1/traces",
+        data=json.dumps(to_otlp(spans)).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        urllib.request.urlopen(request, timeout=OTLP_TIMEOUT).close()
+    except Exception as e:
+        logger.warning(f"Could not send {len(spans)} spans to {OTLP_ENDPOINT}: {e}")
+
+
+def read_trace(trace_id):
+    """Spans written by the file exporter, ordered by start time"""
+    path = trace_path(trace_id)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    return sorted(spans, key=lambda s: s["start_ns"])
+
+
+def summarize(spans):
+    """Spans as offsets and durations in ms from the start of the trace"""
+    if not spans:
+        return []
+    origin = min(s["start_ns"] for s in spans)
+    return [{
+        "name": s["name"],
+        "service": s["service"],
+        "span_id": s["span_id"],
+        "parent_id": s["parent_id"],
+        "offset_ms": round((s["start_ns"] - origin) / 1e6, 3),
+        "duration_ms": round((s["end_ns"] - s["start_ns"]) / 1e6, 3),
+        "attributes": s["attributes"],
+        "error": s["error"],
+    } for s in spans]
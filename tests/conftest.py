@@ -0,0 +1,72 @@
+import pytest
+
+from shared import control
+
+
+class FakeRedis:
+    """Just enough of the redis client for the code under test"""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.hashes.pop(key, None)
+            self.ttls.pop(key, None)
+
+    def incrby(self, key, amount):
+        self.values[key] = int(self.values.get(key, 0)) + amount
+        return self.values[key]
+
+    def llen(self, key):
+        return self.values.get(key, 0)
+
+    def ttl(self, key):
+        return self.ttls.get(key, -2)
+
+    def hset(self, key, mapping):
+        # redis stores every field as a string
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues calls and runs them against the client on execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(control, "_client", client)
+    return client
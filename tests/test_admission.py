@@ -0,0 +1,93 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from api.src import admission
+from api.src.admission import AdmissionMiddleware, charge_upload
+
+
+@pytest.fixture
+def redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(admission, "_depth_cache", {"at": 0.0, "depth": None})
+    monkeypatch.setattr(admission, "DEPTH_CACHE_SECONDS", 0)
+    monkeypatch.setattr(admission, "MIN_FREE_DISK_BYTES", 0)
+    monkeypatch.setattr(admission, "WORKER_CONCURRENCY", 2)
+    monkeypatch.setattr(admission, "MAX_QUEUE_PER_SLOT", 5)
+    return fake_redis
+
+
+@pytest.fixture
+def client(redis):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+    received = []
+
+    @app.post("/upload")
+    async def upload(csv_file: UploadFile = File()):
+        received.append(len(await csv_file.read()))
+        return {"size": received[-1]}
+
+    test_client = TestClient(app)
+    test_client.received = received
+    return test_client
+
+
+def upload(client, size, **kwargs):
+    return client.post("/upload", files={"csv_file": ("a.csv", b"x" * size, "text/csv")}, **kwargs)
+
+
+def test_upload_within_limits_is_accepted(client):
+    assert upload(client, 100).json() == {"size": 100}
+
+
+def test_oversized_upload_is_refused_before_the_endpoint(client, monkeypatch):
+    monkeypatch.setattr(admission, "MAX_UPLOAD_BYTES", 1000)
+
+    response = upload(client, 5000)
+
+    assert response.status_code == 413
+    assert client.received == []
+
+
+def test_body_without_content_length_is_cut_off(client, monkeypatch):
+    monkeypatch.setattr(admission, "MAX_UPLOAD_BYTES", 1000)
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 500
+
+    response = client.post("/upload", content=chunks(),
+                           headers={"Content-Type": "multipart/form-data; boundary=b"})
+
+    assert response.status_code == 413
+    assert client.received == []
+
+
+def test_full_queue_returns_503_with_retry_after(client, redis):
+    redis.values["csv_processing"] = 6
+    redis.values["csv_processing:5"] = 6  # budget is 5 per slot * 2 slots
+
+    response = upload(client, 10)
+
+    assert response.status_code == 503
+    # 3 messages over budget, 2 slots, 10s per task
+    assert response.headers["Retry-After"] == "15"
+
+
+def test_upload_quota_is_per_client(client, redis, monkeypatch):
+    monkeypatch.setattr(admission, "CLIENT_UPLOAD_QUOTA_BYTES", 1000)
+    monkeypatch.setattr(admission, "CLIENT_ID_HEADER", "X-Client-Id")
+    charge_upload("alice", 900)
+
+    refused = upload(client, 200, headers={"X-Client-Id": "alice"})
+    assert refused.status_code == 429
+    assert refused.headers["Retry-After"] == str(admission.QUOTA_WINDOW_SECONDS)
+    assert upload(client, 200, headers={"X-Client-Id": "bob"}).status_code == 200
+
+
+def test_queue_depth_fails_open_without_redis(client, monkeypatch):
+    def broken():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(admission, "get_redis", broken)
+
+    assert upload(client, 10).status_code == 200
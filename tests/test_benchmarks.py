@@ -0,0 +1,52 @@
+from benchmarks.datagen import make_dataframe
+from benchmarks.run import compare
+from benchmarks.bench_load import db_mode_comparison
+
+
+def test_datagen_shape_and_ratios():
+    df = make_dataframe(rows=2000, width=6, null_ratio=0.1, duplicate_ratio=0.2)
+
+    assert len(df) == 2000
+    assert len(df.columns) == 6
+    assert df.columns[0] == "int_0"
+    # the first column is kept complete so it can be used as a key
+    assert df["int_0"].notna().all()
+    # roughly 10% of the other cells are missing
+    assert 0.05 < df["float_1"].isna().mean() < 0.15
+    # at least the injected 20% of rows are duplicates
+    assert df.duplicated().sum() >= 400
+
+
+def test_datagen_is_reproducible():
+    a = make_dataframe(rows=500, seed=7)
+    b = make_dataframe(rows=500, seed=7)
+    assert a.equals(b)
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {
+        "ops.remove_duplicates": {"rows_per_s": 1000, "p95_ms": 10},
+        "ops.drop_columns": {"rows_per_s": 1000, "p95_ms": 10},
+    }}
+    results = {
+        "ops.remove_duplicates": {"rows_per_s": 700, "p95_ms": 10},
+        "ops.drop_columns": {"rows_per_s": 950, "p95_ms": 11},
+    }
+
+    regressions = compare(results, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("ops.remove_duplicates.rows_per_s")
+
+
+def test_db_modes_are_reported_side_by_side():
+    results = {
+        "load.read_endpoints": {"requests_per_s": 900.0, "p95_ms": 40},
+        "load.read_endpoints.sync": {"requests_per_s": 300.0, "p95_ms": 120},
+    }
+
+    line = db_mode_comparison(results)
+
+    assert "async 900.0 req/s" in line and "sync 300.0 req/s" in line
+    assert line.endswith("3.00x")
+    assert db_mode_comparison({"load.read_endpoints": results["load.read_endpoints"]}) is None
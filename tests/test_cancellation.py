@@ -0,0 +1,48 @@
+import pytest
+import pandas as pd
+
+from shared import control
+from worker.src import cancellation
+from worker.src.cancellation import TaskCancelled, TaskPreempted, check_signals
+
+
+pytestmark = pytest.mark.usefixtures("fake_redis")
+
+
+def test_no_signal_passes():
+    check_signals("task-1")
+
+
+def test_cancel_signal_raises():
+    control.request_cancel("task-1")
+    with pytest.raises(TaskCancelled):
+        check_signals("task-1")
+    # cancellation stays set until the worker has cleaned up
+    assert control.pending_signal("task-1") == control.CANCEL
+
+
+def test_preempt_signal_raises_once():
+    control.request_preempt("task-1")
+    with pytest.raises(TaskPreempted):
+        check_signals("task-1")
+    # the resumed run must not be preempted again by the same request
+    check_signals("task-1")
+
+
+def test_preempt_does_not_override_cancel():
+    control.request_cancel("task-1")
+    control.request_preempt("task-1")
+    with pytest.raises(TaskCancelled):
+        check_signals("task-1")
+
+
+def test_checkpoint_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(cancellation, "CHECKPOINT_DIR", str(tmp_path))
+    df = pd.DataFrame({'A': [1, 2, None], 'B': ['x', 'y', 'z']})
+
+    path = cancellation.save_checkpoint("task-1", df)
+    restored = cancellation.load_checkpoint(path)
+
+    assert restored.equals(df)
+    cancellation.remove_file(path)
+    assert not (tmp_path / "task-1.pkl").exists()
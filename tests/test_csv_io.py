@@ -0,0 +1,113 @@
+import pytest
+import pandas as pd
+
+from worker.src import csv_io
+from worker.src.csv_io import read_csv, write_csv, iter_csv_blocks
+
+
+SAMPLE = (
+    "id,name,joined,score,visits\n"
+    "1,Ann,2024-01-02,1.5,\n"
+    '2,"Bo, b",2024-01-03 10:00:00,NA,3\n'
+    "3,,2024-01-04,2.0,4\n"
+)
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text(SAMPLE)
+    return str(path)
+
+
+def test_engines_read_the_same_frame(sample):
+    by_pandas, engine_a = read_csv(sample, {"reader": "pandas"})
+    by_arrow, engine_b = read_csv(sample, {"reader": "pyarrow"})
+
+    assert (engine_a, engine_b) == ("pandas", "pyarrow")
+    pd.testing.assert_frame_equal(by_pandas, by_arrow)
+    # dates stay text, so writing them back doesn't reformat them
+    assert by_arrow["joined"].tolist()[1] == "2024-01-03 10:00:00"
+
+
+def test_pandas_is_the_default_reader(sample):
+    assert read_csv(sample)[1] == "pandas"
+
+
+@pytest.mark.parametrize("text", [
+    "flag,upper,blank\ntrue,True,true\nfalse,FALSE,\n",  # bool-like
+    "mixed,num\n1,1\nx,2.5\n7,\n",  # mixed types, int with a blank
+])
+def test_engines_agree_on_tricky_columns(tmp_path, text):
+    path = tmp_path / "in.csv"
+    path.write_text(text)
+    by_pandas, _ = read_csv(str(path), {"reader": "pandas"})
+    by_arrow, engine = read_csv(str(path), {"reader": "pyarrow"})
+    assert engine == "pyarrow"
+    pd.testing.assert_frame_equal(by_pandas, by_arrow)
+
+
+def test_duplicate_headers_are_read_by_pandas(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("a,a,b\n1,2,3\n")
+    df, engine = read_csv(str(path), {"reader": "pyarrow"})
+    assert engine == "pandas"
+    assert list(df.columns) == ["a", "a.1", "b"]
+
+
+def test_explicit_dtypes(sample):
+    options = {"dtypes": {"id": "string", "joined": "datetime", "name": "category"}}
+    for engine in ("pandas", "pyarrow"):
+        df, _ = read_csv(sample, {**options, "reader": engine})
+        assert df["id"].tolist() == ["1", "2", "3"]
+        assert pd.api.types.is_datetime64_any_dtype(df["joined"])
+        assert isinstance(df["name"].dtype, pd.CategoricalDtype)
+
+
+def test_multi_character_delimiter_falls_back_to_pandas(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("a||b\n1||2\n")
+    df, engine = read_csv(str(path), {"reader": "pyarrow", "delimiter": "||"})
+    assert engine == "pandas"
+    assert df.to_dict("list") == {"a": [1], "b": [2]}
+
+
+def test_unparseable_input_falls_back_to_pandas(tmp_path):
+    path = tmp_path / "in.csv"
+    # ragged rows: pyarrow refuses, pandas fills the gap
+    path.write_text("a,b,c\n1,2,3\n4,5\n")
+    df, engine = read_csv(str(path), {"reader": "pyarrow"})
+    assert engine == "pandas"
+    assert len(df) == 2
+
+
+def test_pandas_writer_output_is_unchanged(sample, tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_io, "WRITE_BLOCK_ROWS", 2)
+    df, _ = read_csv(sample)
+    out = tmp_path / "out.csv"
+
+    assert write_csv(df, str(out), {"writer": "pandas"}) == "pandas"
+    assert out.read_text() == df.to_csv(index=False)
+
+
+def test_pyarrow_writer_streams_blocks_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_io, "WRITE_BLOCK_ROWS", 10)
+    monkeypatch.setattr(csv_io, "WRITE_THREADS", 2)
+    df = pd.DataFrame({"n": range(95), "s": [f"v{i}" for i in range(95)]})
+
+    engine, blocks = iter_csv_blocks(df, {"writer": "pyarrow"})
+    blocks = list(blocks)
+
+    assert engine == "pyarrow"
+    assert len(blocks) == 10
+    path = tmp_path / "out.csv"
+    path.write_bytes(b"".join(blocks))
+    pd.testing.assert_frame_equal(pd.read_csv(path), df)
+
+
+def test_empty_frame_keeps_its_header(tmp_path):
+    df = pd.DataFrame({"a": pd.Series([], dtype="int64"), "b": pd.Series([], dtype="float64")})
+    for engine in ("pandas", "pyarrow"):
+        out = tmp_path / f"{engine}.csv"
+        write_csv(df, str(out), {"writer": engine})
+        assert list(pd.read_csv(out).columns) == ["a", "b"]
@@ -0,0 +1,35 @@
+from sqlalchemy import create_engine, inspect, text
+
+from shared.db_models import ADDED_COLUMNS, Base, Task, add_missing_columns
+
+# the tasks table as the first release created it
+FIRST_RELEASE = [
+    "id", "filename", "original_filename", "file_path", "config", "status", "progress",
+    "created_at", "started_at", "completed_at", "result_path", "error_message", "celery_task_id",
+]
+
+
+def test_existing_tasks_table_gains_new_columns():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE tasks (id VARCHAR PRIMARY KEY, filename VARCHAR, "
+            "original_filename VARCHAR, file_path VARCHAR, config JSON, status VARCHAR, "
+            "progress VARCHAR, created_at DATETIME, started_at DATETIME, "
+            "completed_at DATETIME, result_path VARCHAR, error_message TEXT, "
+            "celery_task_id VARCHAR)"))
+        conn.execute(text("INSERT INTO tasks (id, status) VALUES ('old', 'completed')"))
+
+    for _ in range(2):  # every start runs it again
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            add_missing_columns(conn)
+
+    registered = {name for table, name in ADDED_COLUMNS if table == "tasks"}
+    columns = {c["name"] for c in inspect(engine).get_columns("tasks")}
+    assert columns == set(FIRST_RELEASE) | registered
+    indexes = {i["name"] for i in inspect(engine).get_indexes("tasks")}
+    assert {index.name for index in Task.__table__.indexes
+            if any(c.name in registered for c in index.columns)} <= indexes
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT status FROM tasks WHERE id = 'old'")).scalar() == "completed"
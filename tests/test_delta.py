@@ -0,0 +1,111 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+import pandas as pd
+
+from worker.src import delta as delta_module
+from worker.src.delta import DeltaRun
+
+
+OPS = [
+    {"op": "remove_duplicates", "params": {"subset": ["k"]}},
+    {"op": "fill_missing", "params": {"method": "mean", "columns": ["v"]}},
+]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(delta_module, "STATE_DIR", str(tmp_path / "state"))
+    return tmp_path
+
+
+def make_task(task_id, content, **config):
+    path = f"{task_id}.csv"
+    with open(path, "w") as f:
+        f.write(content)
+    return SimpleNamespace(id=task_id, file_path=path,
+                           config={"operations": OPS, **config}, result_path=None)
+
+
+def unused_handler(df, params):
+    raise AssertionError("stateful operations must not fall back to the plain handler")
+
+
+def run(task, previous=None):
+    delta = DeltaRun(task, previous)
+    df, _ = delta.read({})
+    for i, op in enumerate(OPS):
+        df = delta.apply(i, op["op"], op["params"], df, unused_handler)
+    task.result_path = f"{task.id}.out.csv"
+    delta.write(df, task.result_path, {})
+    task.delta_state = delta.finish()
+    return pd.read_csv(task.result_path)
+
+
+def test_continue_processes_only_appended_rows():
+    day1 = "k,v\n1,10\n2,\n1,99\n"
+    first = make_task("a", day1, incremental=True)
+    assert run(first).to_dict("list") == {"k": [1, 2], "v": [10.0, 10.0]}
+
+    # k=2 was seen yesterday; the unterminated last line waits for tomorrow
+    second = make_task("b", day1 + "3,30\n2,5\n4,\n5,1", continue_from="a")
+    out = run(second, first)
+
+    assert out["k"].tolist() == [3, 4]
+    # the mean covers every non-blank value seen so far: (10 + 30) / 2
+    assert out["v"].tolist() == [30.0, 20.0]
+    assert second.delta_state["rows_total"] == 6
+    assert second.delta_state["offset"] == len(day1 + "3,30\n2,5\n4,\n")
+
+
+def test_append_output_extends_the_previous_result():
+    day1 = "k,v\n1,1\n"
+    first = make_task("a", day1, incremental=True, delta_output="append")
+    run(first)
+
+    first_result = os.stat(first.result_path)
+
+    second = make_task("b", day1 + "2,3\n", continue_from="a", delta_output="append")
+    assert run(second, first).to_dict("list") == {"k": [1, 2], "v": [1.0, 3.0]}
+    # the file was extended in place, not copied, and now belongs to "b"
+    assert os.stat(second.result_path).st_ino == first_result.st_ino
+    assert first.result_path is None
+
+
+def test_failed_append_gives_the_previous_result_back(monkeypatch):
+    first = make_task("a", "k,v\n1,1\n", incremental=True, delta_output="append")
+    run(first)
+    before = open(first.result_path).read()
+
+    def broken(df, path, options, append=False):
+        with open(path, "a") as f:
+            f.write("2,")  # half a row, then the disk fills up
+        raise OSError("No space left on device")
+    monkeypatch.setattr(delta_module, "write_csv", broken)
+
+    second = make_task("b", "k,v\n1,1\n2,3\n", continue_from="a", delta_output="append")
+    with pytest.raises(OSError):
+        run(second, first)
+    assert open(first.result_path).read() == before
+    assert not os.path.exists(second.result_path)
+
+
+def test_rewritten_source_is_rejected():
+    first = make_task("a", "k,v\n1,1\n2,2\n", incremental=True)
+    run(first)
+
+    second = make_task("b", "k,v\n9,9\n9,9\n9,9\n", continue_from="a")
+    with pytest.raises(ValueError, match="rewritten"):
+        DeltaRun(second, first).read({})
+
+
+def test_dedup_matches_across_int_and_float_reads():
+    first = make_task("a", "k,v\n1,1\n", incremental=True)
+    run(first)
+
+    # k is read as float in this delta because of the blank
+    second = make_task("b", "k,v\n1,1\n1,2\n,3\n", continue_from="a")
+    out = run(second, first)
+    assert out["v"].tolist() == [3.0]
@@ -0,0 +1,74 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.src.downloads import result_response, _parse_range
+from shared.storage import file_sha256
+
+
+@pytest.fixture
+def result_file(tmp_path):
+    path = tmp_path / "processed_test.csv"
+    path.write_text("name,age\nJohn,30\nJane,25\n")
+    return str(path)
+
+
+@pytest.fixture
+def client(result_file):
+    app = FastAPI()
+
+    @app.api_route("/download", methods=["GET", "HEAD"])
+    def download(request: Request):
+        return result_response(request, result_file, file_sha256(result_file))
+
+    return TestClient(app)
+
+
+def test_full_download_has_caching_headers(client, result_file):
+    response = client.get("/download")
+
+    assert response.status_code == 200
+    assert response.content == open(result_file, "rb").read()
+    assert response.headers["etag"] == f'"{file_sha256(result_file)}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "processed_test.csv" in response.headers["content-disposition"]
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/download").headers["etag"]
+
+    response = client.get("/download", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_range_request_returns_partial_content(client, result_file):
+    body = open(result_file, "rb").read()
+
+    response = client.get("/download", headers={"Range": "bytes=0-3"})
+
+    assert response.status_code == 206
+    assert response.content == body[:4]
+    assert response.headers["content-range"] == f"bytes 0-3/{len(body)}"
+
+
+def test_unsatisfiable_range(client, result_file):
+    response = client.get("/download", headers={"Range": "bytes=9999-"})
+    assert response.status_code == 416
+
+
+def test_stale_if_range_sends_full_body(client, result_file):
+    response = client.get(
+        "/download", headers={"Range": "bytes=0-3", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == open(result_file, "rb").read()
+
+
+def test_parse_range():
+    assert _parse_range("bytes=10-", 100) == (10, 99)
+    assert _parse_range("bytes=-10", 100) == (90, 99)
+    assert _parse_range("bytes=0-500", 100) == (0, 99)
+    assert _parse_range("bytes=0-1,5-6", 100) is None
+    assert _parse_range("bytes=200-300", 100) == "unsatisfiable"
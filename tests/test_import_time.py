@@ -0,0 +1,27 @@
+import os
+import sys
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_modules(statement, modules):
+    """Run `statement` in a fresh interpreter and report which `modules` it loaded"""
+    code = f"import sys; {statement}; print([m for m in {modules!r} if m in sys.modules])"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([REPO_ROOT, os.path.join(REPO_ROOT, "api")])
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=os.path.join(REPO_ROOT, "api"),
+        capture_output=True, text=True, check=True)
+    return eval(out.stdout.strip().splitlines()[-1])
+
+
+def test_api_startup_does_not_import_pandas_or_worker_tasks():
+    loaded = imported_modules("import src.main", ["pandas", "numpy", "worker.src.tasks"])
+    assert loaded == []
+
+
+def test_celery_app_is_lightweight():
+    loaded = imported_modules("import worker.src.celery_app", ["pandas", "worker.src.tasks"])
+    assert loaded == []
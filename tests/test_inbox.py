@@ -0,0 +1,101 @@
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.db_models import Base, InboxFile, Task
+from worker.src import inbox
+from worker.src.inbox import settled_files, micro_batches, claim, republish_orphans
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def touch(path, content, age):
+    path.write_text(content)
+    stamp = path.stat().st_mtime - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_only_settled_csvs_are_listed_oldest_first(tmp_path):
+    now = tmp_path.stat().st_mtime
+    touch(tmp_path / "b.csv", "a\n1\n", age=60)
+    touch(tmp_path / "a.csv", "a\n1\n2\n", age=120)
+    touch(tmp_path / "fresh.csv", "a\n", age=0)
+    touch(tmp_path / ".partial.csv", "a\n", age=120)
+    touch(tmp_path / "notes.txt", "x", age=120)
+
+    entries = settled_files(str(tmp_path), watermark=now - 30)
+
+    assert [name for name, _, _ in entries] == ["a.csv", "b.csv"]
+    assert entries[0][1] == 6
+
+
+def test_micro_batches_respect_file_and_byte_limits():
+    entries = [("a", 10), ("b", 10), ("c", 10), ("big", 100), ("d", 5)]
+
+    assert micro_batches(entries, max_files=2, max_bytes=50) == [
+        [("a", 10), ("b", 10)], [("c", 10)], [("big", 100)], [("d", 5)],
+    ]
+    assert micro_batches([], max_files=2, max_bytes=50) == []
+
+
+def test_a_file_is_claimed_once(db):
+    entry = ("a.csv", 6, 123)
+
+    assert claim(db, "daily", entry) is not None
+    assert claim(db, "daily", entry) is None
+    # same name with new content is a different file
+    assert claim(db, "daily", ("a.csv", 9, 456)) is not None
+
+
+def test_a_stale_claim_is_taken_over(db, monkeypatch):
+    monkeypatch.setattr(inbox, "INBOX_CLAIM_TIMEOUT", 60)
+    row = claim(db, "daily", ("a.csv", 6, 123))
+    row.claimed_at = datetime.now() - timedelta(minutes=5)
+    db.commit()
+
+    assert claim(db, "daily", ("a.csv", 6, 123)) is not None
+    assert db.query(InboxFile).count() == 1
+
+
+def test_unsent_inbox_tasks_are_published_by_a_later_scan(db, monkeypatch):
+    sent = []
+
+    def publish(task_id, priority):
+        def apply_async(headers=None):
+            if not sent:
+                sent.append(None)
+                raise ConnectionError("broker down")
+            sent.append(task_id)
+            return SimpleNamespace(id=f"celery-{task_id}")
+        return SimpleNamespace(apply_async=apply_async)
+
+    monkeypatch.setattr(inbox, "process_csv", publish)
+    monkeypatch.setattr(inbox, "INBOX_CLAIM_TIMEOUT", 60)
+    an_hour_ago = datetime.now() - timedelta(hours=1)
+    for task_id, queued_at in (("orphan", an_hour_ago), ("just-ingested", datetime.now())):
+        db.add(Task(id=task_id, status="queued", queued_at=queued_at, config={}))
+        db.add(InboxFile(pipeline="daily", name=f"{task_id}.csv", size=1, mtime_ns=1,
+                         status="ingested", task_id=task_id))
+    db.add(Task(id="api-upload", status="queued", queued_at=an_hour_ago, config={}))
+    db.commit()
+
+    # the broker refuses: the task stays queued instead of being parked
+    assert inbox.enqueue(db, ["orphan"], {}) is None
+    assert db.get(Task, "orphan").status == "queued"
+
+    assert republish_orphans(db) == 1
+    assert republish_orphans(db) == 0  # sent once
+    assert sent == [None, "orphan"]
+    assert db.get(Task, "orphan").celery_task_id == "celery-orphan"
+    assert db.get(Task, "just-ingested").celery_task_id is None
@@ -0,0 +1,69 @@
+import os
+import time
+
+import numpy as np
+import pytest
+import pandas as pd
+from worker.src.instrumentation import ExecutionReport
+
+
+@pytest.fixture
+def sample_dataframe():
+    return pd.DataFrame({
+        'A': [1, 1, 2, 3],
+        'B': ['x', 'x', 'y', None],
+    })
+
+
+def test_stage_records_shapes_and_timings(sample_dataframe):
+    report = ExecutionReport()
+
+    with report.stage("1:remove_duplicates", sample_dataframe, operation="remove_duplicates") as stage:
+        result = sample_dataframe.drop_duplicates()
+        stage.output(result)
+
+    data = report.to_dict()
+    record = data["stages"][0]
+    assert record["stage"] == "1:remove_duplicates"
+    assert record["rows_in"] == 4 and record["rows_out"] == 3
+    assert record["columns_in"] == 2 and record["columns_out"] == 2
+    assert record["wall_seconds"] >= 0
+    assert record["cpu_seconds"] >= 0
+    assert record["peak_memory_delta_mb"] >= 0
+    assert data["total_seconds"] >= record["wall_seconds"]
+
+
+def test_stage_without_input_frame():
+    report = ExecutionReport()
+    with report.stage("read") as stage:
+        stage.output(pd.DataFrame({'A': [1, 2]}))
+
+    record = report.to_dict()["stages"][0]
+    assert record["rows_in"] is None
+    assert record["rows_out"] == 2
+
+
+def test_failed_stage_is_recorded(sample_dataframe):
+    report = ExecutionReport()
+    with pytest.raises(KeyError):
+        with report.stage("2:drop_columns", sample_dataframe, operation="drop_columns"):
+            raise KeyError("Z")
+
+    record = report.to_dict()["stages"][0]
+    assert "Z" in record["error"]
+    assert record["rows_out"] is None
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+def test_stage_peak_memory_is_measured_per_stage():
+    report = ExecutionReport()
+    # the first stage raises the process high-water mark past the second
+    for name, megabytes in (("big", 160), ("small", 80)):
+        with report.stage(name):
+            block = np.ones(megabytes * 1024**2 // 8)
+            time.sleep(0.05)
+            del block
+
+    big, small = report.to_dict()["stages"]
+    assert big["peak_memory_delta_mb"] >= 120
+    assert small["peak_memory_delta_mb"] >= 60
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.db_models import Base, Task
+from worker.src import maintenance
+from worker.src.maintenance import abandon_stale_tasks, expired_tasks
+
+NOW = datetime(2026, 1, 10, 12, 0)
+HOURS = timedelta(hours=1)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    monkeypatch.setattr(maintenance, "STALE_TASK_FACTOR", 4)  # 4 x 30 min time limit
+    yield session
+    session.close()
+
+
+def add(db, task_id, status, queued_ago, started_ago=None):
+    db.add(Task(id=task_id, status=status, created_at=NOW - 30 * HOURS,
+                queued_at=NOW - queued_ago,
+                started_at=NOW - started_ago if started_ago else None))
+    db.commit()
+
+
+def test_stuck_tasks_are_failed_and_then_expire(db, monkeypatch):
+    progress = {"live": {"updated": (NOW - 0.5 * HOURS).timestamp()},
+                "silent": {"updated": (NOW - 5 * HOURS).timestamp()}}
+    monkeypatch.setattr(maintenance, "read_progress", progress.get)
+    add(db, "orphan", "queued", queued_ago=3 * HOURS)  # published but never run
+    add(db, "recent", "queued", queued_ago=1 * HOURS)  # uploaded long ago, queued just now
+    add(db, "live", "processing", queued_ago=6 * HOURS, started_ago=6 * HOURS)
+    add(db, "silent", "processing", queued_ago=6 * HOURS, started_ago=6 * HOURS)
+
+    assert abandon_stale_tasks(db, NOW, limit=10) == 2
+
+    status = {task.id: task.status for task in db.query(Task)}
+    assert status == {"orphan": "failed", "recent": "queued", "live": "processing", "silent": "failed"}
+    assert db.get(Task, "orphan").error_message.startswith("Abandoned: no progress for 2h")
+    later = NOW + timedelta(days=maintenance.RETENTION_DAYS["failed"] + 1)
+    assert {task.id for task in expired_tasks(db, later, 10)} == {"orphan", "silent"}
+
+
+def test_nothing_is_failed_while_progress_cannot_be_read(db, monkeypatch):
+    def redis_down(task_id):
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(maintenance, "read_progress", redis_down)
+    add(db, "orphan", "queued", queued_ago=3 * HOURS)
+
+    assert abandon_stale_tasks(db, NOW, limit=10) == 0
+    assert db.get(Task, "orphan").status == "queued"
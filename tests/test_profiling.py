@@ -0,0 +1,42 @@
+import time
+from worker.src.profiling import SamplingProfiler, should_profile
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_profiler_collects_stacks():
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy_loop(0.1)
+    profiler.stop()
+
+    assert profiler.samples > 0
+    assert any("busy_loop" in frame for stack in profiler.stacks for frame in stack)
+
+
+def test_collapsed_and_speedscope_formats():
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy_loop(0.05)
+    profiler.stop()
+
+    first_line = profiler.collapsed().splitlines()[0]
+    stack, count = first_line.rsplit(" ", 1)
+    assert ";" in stack
+    assert int(count) > 0
+
+    doc = profiler.speedscope()
+    profile = doc["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    frame_count = len(doc["shared"]["frames"])
+    assert all(0 <= i < frame_count for sample in profile["samples"] for i in sample)
+
+
+def test_should_profile_honours_config_flag():
+    assert should_profile({"operations": [], "profile": True})
+    assert not should_profile({"operations": []})
@@ -0,0 +1,41 @@
+import pytest
+
+from shared import progress
+
+
+pytestmark = pytest.mark.usefixtures("fake_redis")
+
+
+def test_no_progress_reported():
+    assert progress.read_progress("task-1") is None
+
+
+def test_progress_roundtrip(fake_redis):
+    progress.write_progress("task-1", 42, "Applying drop_columns...", "drop_columns", 3, 5)
+    data = progress.read_progress("task-1")
+
+    assert data["current"] == 42
+    assert data["operation"] == "drop_columns"
+    assert (data["step"], data["total_steps"]) == (3, 5)
+    assert fake_redis.ttls["csv:progress:task-1"] == progress.PROGRESS_TTL
+
+
+def test_progress_fields_are_bounded(fake_redis):
+    progress.write_progress("task-1", 10, "x" * 1000, "y" * 1000)
+    stored = fake_redis.hashes["csv:progress:task-1"]
+
+    assert len(stored["status"]) <= 120
+    assert len(stored["operation"]) <= 60
+    assert set(stored) == {"current", "status", "operation", "step", "total_steps", "updated"}
+
+
+def test_finished_progress_expires_soon(fake_redis):
+    progress.write_progress("task-1", 50, "running")
+    progress.finish_progress("task-1", "Completed")
+
+    assert progress.read_progress("task-1")["current"] == 100
+    assert fake_redis.ttls["csv:progress:task-1"] == progress.FINISHED_TTL
+
+    progress.clear_progress("task-1")
+    assert progress.read_progress("task-1") is None
+
@@ -0,0 +1,130 @@
+from types import SimpleNamespace
+
+import pytest
+import pandas as pd
+
+from worker.src import references
+from worker.src.references import build_reference_file, load_reference, lookup
+
+
+@pytest.fixture
+def reference(tmp_path, monkeypatch):
+    """Build `regions` from a CSV and resolve lookups to it without a database"""
+    def build(csv_text, name="regions"):
+        source = tmp_path / f"{name}.csv"
+        source.write_text(csv_text)
+        target = str(tmp_path / f"{name}.arrow")
+        build_reference_file(str(source), target)
+        return target
+
+    paths = {}
+
+    def register(csv_text, name="regions"):
+        paths[name] = build(csv_text, name)
+        return paths[name]
+
+    monkeypatch.setattr(references, "resolve_reference_path", lambda name: paths[name])
+    monkeypatch.setattr(references, "_cache", type(references._cache)())
+    return register
+
+
+def customers():
+    return pd.DataFrame({"customer_id": [3, 1, 2, 9], "amount": [30, 10, 20, 90]})
+
+
+def test_left_lookup_keeps_unmatched_rows(reference):
+    reference("customer_id,region,tier\n1,EU,gold\n2,US,silver\n3,APAC,gold\n")
+
+    out = lookup(customers(), {"table": "regions", "on": "customer_id"})
+
+    assert list(out.columns) == ["customer_id", "amount", "region", "tier"]
+    assert out["region"].tolist()[:3] == ["APAC", "EU", "US"]
+    assert pd.isna(out["region"].iloc[3])
+
+
+def test_inner_lookup_drops_unmatched_rows(reference):
+    reference("id,region\n1,EU\n2,US\n3,APAC\n")
+
+    out = lookup(customers(), {
+        "table": "regions", "left_on": "customer_id", "right_on": "id",
+        "columns": ["region"], "how": "inner",
+    })
+
+    assert out["customer_id"].tolist() == [3, 1, 2]
+    assert out["region"].tolist() == ["APAC", "EU", "US"]
+
+
+def test_lookup_matches_text_keys_against_numbers(reference):
+    reference("customer_id,region\n1,EU\n2,US\n")
+    df = pd.DataFrame({"customer_id": ["2", "1"]})
+
+    out = lookup(df, {"table": "regions", "on": "customer_id"})
+
+    assert out["region"].tolist() == ["US", "EU"]
+
+
+def test_numeric_keys_with_blanks_match_text_keys(reference):
+    reference("code,region\n7,EU\n8,US\nNA,none\nA1,APAC\n")
+    # the blank makes the key column float64: 7.0 must still match "7"
+    df = pd.DataFrame({"code": [7, 8, None]})
+
+    out = lookup(df, {"table": "regions", "on": "code"})
+
+    assert out["region"].tolist()[:2] == ["EU", "US"]
+    assert pd.isna(out["region"].iloc[2])  # a blank key matches nothing
+
+
+def test_existing_column_names_get_a_suffix(reference):
+    reference("customer_id,amount\n1,100\n")
+    out = lookup(customers(), {"table": "regions", "on": "customer_id"})
+    assert "amount_ref" in out.columns
+
+
+def test_non_unique_keys_fall_back_to_a_full_join(reference):
+    reference("customer_id,region\n1,EU\n1,US\n")
+    out = lookup(customers(), {"table": "regions", "on": "customer_id", "how": "inner"})
+    assert sorted(out["region"]) == ["EU", "US"]
+
+
+def test_unknown_columns_are_rejected(reference):
+    reference("customer_id,region\n1,EU\n")
+    with pytest.raises(ValueError):
+        lookup(customers(), {"table": "regions", "on": "customer_id", "columns": ["nope"]})
+
+
+def test_loaded_tables_are_cached_lru(reference, monkeypatch):
+    monkeypatch.setattr(references, "REFERENCE_CACHE_SIZE", 2)
+    a = reference("k,v\n1,a\n", "a")
+    b = reference("k,v\n1,b\n", "b")
+    c = reference("k,v\n1,c\n", "c")
+
+    first = load_reference(a)
+    load_reference(b)
+    assert load_reference(a) is first  # hit, and now most recent
+    load_reference(c)
+
+    assert list(references._cache) == [a, c]
+
+
+def test_a_task_resolves_each_table_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(references, "_cache", type(references._cache)())
+    (tmp_path / "regions.csv").write_text("customer_id,region\n1,EU\n2,US\n")
+    path = str(tmp_path / "regions.arrow")
+    build_reference_file(str(tmp_path / "regions.csv"), path)
+    queries = []
+
+    class Session:
+        def get(self, model, name):
+            queries.append(name)
+            return SimpleNamespace(path=path) if name == "regions" else None
+
+    token = references.pin_references(Session())
+    try:
+        for _ in range(3):
+            lookup(customers(), {"table": "regions", "on": "customer_id"})
+        with pytest.raises(ValueError):
+            lookup(customers(), {"table": "missing", "on": "customer_id"})
+    finally:
+        references.unpin_references(token)
+
+    assert queries == ["regions", "missing"]
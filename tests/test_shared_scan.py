@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from shared.schemas import ConfigSchema
+from worker.src import cancellation
+from worker.src.cancellation import TaskPreempted
+from worker.src.instrumentation import ExecutionReport
+from worker.src.shared_scan import SharedScan
+from worker.src.validation import ValidationRun
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # outputs go to ./output/<task id>/
+    signals = {}
+    monkeypatch.setattr(cancellation, "pending_signal", lambda task_id: signals.pop(task_id, None))
+    monkeypatch.setattr(cancellation, "clear_signal", lambda task_id: None)
+    return signals
+
+
+def make_task(pipelines):
+    return SimpleNamespace(id="t1", original_filename="in.csv", config={"pipelines": pipelines})
+
+
+def upper(df, params):
+    df[params["column"]] = df[params["column"]].str.upper()
+    return df
+
+
+def run(scan, df, progress=None):
+    calls = progress if progress is not None else []
+    scan.run(df, ExecutionReport(), ValidationRun(scan.task), {},
+             lambda *args, **kwargs: calls.append(kwargs["pipelines"]))
+    return scan
+
+
+@pytest.fixture
+def people():
+    return pd.DataFrame({"name": ["ann", "bob", "bob"], "age": [30, 40, 40]})
+
+
+def test_each_pipeline_sees_the_input_and_gets_its_own_output(people):
+    seen = {}
+
+    def spy(df, params):
+        seen["shares_age"] = np.shares_memory(df["age"].to_numpy(), people["age"].to_numpy())
+        return df
+
+    progress = []
+    scan = run(SharedScan(make_task({
+        "shout": [{"op": "upper", "params": {"column": "name"}}, {"op": "spy"}],
+        "dedupe": [{"op": "remove_duplicates", "params": {}}],
+    }), {"upper": upper, "spy": spy,
+         "remove_duplicates": lambda df, params: df.drop_duplicates()}), people, progress)
+
+    assert people["name"].tolist() == ["ann", "bob", "bob"]  # input untouched
+    assert seen["shares_age"]  # columns nobody changed are not copied
+    shout, dedupe = scan.outputs["shout"], scan.outputs["dedupe"]
+    assert pd.read_csv(shout["path"])["name"].tolist() == ["ANN", "BOB", "BOB"]
+    assert (shout["rows"], dedupe["rows"]) == (3, 2)
+    assert dedupe["path"].endswith("dedupe_in.csv")
+    assert progress[-1] == {"shout": 100, "dedupe": 100}
+    assert {"shout": 100, "dedupe": 0} in progress
+
+
+def test_a_failing_pipeline_does_not_stop_the_others(people):
+    def broken(df, params):
+        raise KeyError("nope")
+
+    scan = run(SharedScan(make_task({
+        "bad": [{"op": "broken"}],
+        "good": [],
+    }), {"broken": broken}), people)
+
+    assert scan.failed == ["bad"]
+    assert scan.outputs["bad"]["error"] == "KeyError: 'nope'"
+    assert scan.outputs["good"]["rows"] == 3
+    assert scan.total_size() == scan.outputs["good"]["size"]
+
+
+def test_preempted_run_resumes_after_finished_pipelines(people, workdir):
+    calls = []
+
+    def count(df, params):
+        calls.append(params["name"])
+        if params["name"] == "second" and len(calls) == 2:
+            workdir["t1"] = cancellation.PREEMPT  # seen at the next stage boundary
+        return df
+
+    pipelines = {
+        "first": [{"op": "count", "params": {"name": "first"}}],
+        "second": [{"op": "count", "params": {"name": "second"}}],
+    }
+    scan = SharedScan(make_task(pipelines), {"count": count})
+    with pytest.raises(TaskPreempted):
+        run(scan, people)
+    assert list(scan.completed()) == ["first"]
+
+    resumed = run(SharedScan(make_task(pipelines), {"count": count}, scan.completed()), people)
+    assert calls == ["first", "second", "second"]
+    assert [out["status"] for out in resumed.outputs.values()] == ["completed", "completed"]
+
+
+def test_config_takes_operations_or_pipelines():
+    assert ConfigSchema(pipelines={"a": [], "b": "saved"}).operation_lists() == [("a", []), ("b", "saved")]
+    assert ConfigSchema(operations=[]).operation_lists() == [(None, [])]
+    for bad in ({}, {"operations": [{"op": "x"}], "pipelines": {"a": []}},
+                {"pipelines": {"../a": []}}, {"pipelines": {"a": []}, "incremental": True}):
+        with pytest.raises(ValidationError):
+            ConfigSchema(**bad)
@@ -0,0 +1,73 @@
+import io
+import os
+import pytest
+
+from shared import storage
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # storage paths are relative to the service's working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("uploads")
+    return tmp_path
+
+
+def test_identical_uploads_share_one_blob():
+    content = b"name,age\nJohn,30\n"
+
+    path_a, sha_a, size_a = storage.store_upload(io.BytesIO(content), "task-a")
+    path_b, sha_b, _ = storage.store_upload(io.BytesIO(content), "task-b")
+
+    assert sha_a == sha_b
+    assert size_a == len(content)
+    assert open(path_a, "rb").read() == content
+    assert os.path.samefile(path_a, path_b)
+    # blob + two task links
+    assert os.stat(storage.blob_path(sha_a)).st_nlink == 3
+    assert os.listdir(storage.TMP_DIR) == []
+
+
+def test_different_uploads_get_different_blobs():
+    _, sha_a, _ = storage.store_upload(io.BytesIO(b"a\n1\n"), "task-a")
+    _, sha_b, _ = storage.store_upload(io.BytesIO(b"a\n2\n"), "task-b")
+    assert sha_a != sha_b
+
+
+def test_release_only_frees_last_link():
+    content = b"a,b\n1,2\n"
+    path_a, sha, _ = storage.store_upload(io.BytesIO(content), "task-a")
+    path_b, _, _ = storage.store_upload(io.BytesIO(content), "task-b")
+
+    assert storage.release_file(path_a) == 0
+    assert storage.release_file(path_b) == 0
+    # only the blob itself is left, so it is now an orphan
+    orphans = list(storage.orphan_blobs(grace_seconds=0))
+    assert orphans == [storage.blob_path(sha)]
+    assert storage.release_file(orphans[0]) == len(content)
+
+
+def test_recent_orphans_are_kept():
+    path, _, _ = storage.store_upload(io.BytesIO(b"x\n1\n"), "task-a")
+    storage.release_file(path)
+    assert list(storage.orphan_blobs()) == []
+
+
+def test_result_paths_are_unique_per_task():
+    a = storage.result_path("task-a", "data.csv")
+    b = storage.result_path("task-b", "data.csv")
+    assert a != b
+    assert os.path.basename(a) == os.path.basename(b) == "processed_data.csv"
+
+
+def test_release_tree_removes_directory(monkeypatch):
+    monkeypatch.setattr(storage, "TRUNCATE_STEP", 4)
+    path = storage.result_path("task-a", "data.csv")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"0123456789")
+
+    freed = storage.release_tree(storage.result_dir("task-a"), pause=0)
+
+    assert freed == 10
+    assert not os.path.exists(storage.result_dir("task-a"))
@@ -0,0 +1,84 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from shared import tracing
+from shared.tracing import (
+    start_span, begin_span, inject, message_header, parse_traceparent, read_trace, to_otlp
+)
+from worker.src.instrumentation import ExecutionReport, record_queue_wait
+
+
+@pytest.fixture(autouse=True)
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setattr(tracing, "TRACE_EXPORTER", "file")
+    return tmp_path
+
+
+def test_nested_spans_share_a_trace_and_export_once(trace_dir):
+    with start_span("upload") as root:
+        with start_span("store_upload") as child:
+            pass
+        assert read_trace(root.trace_id) == []  # buffered until the root ends
+
+    spans = read_trace(root.trace_id)
+    assert [s["name"] for s in spans] == ["upload", "store_upload"]
+    assert spans[1]["parent_id"] == root.span_id
+    assert child.trace_id == root.trace_id
+    assert len(list(trace_dir.iterdir())) == 1
+
+
+def test_traceparent_continues_a_remote_trace():
+    remote = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    with start_span("process_csv_task", parent=remote) as span:
+        pass
+    assert span.trace_id == "a" * 32 and span.parent_id == "b" * 16
+    assert parse_traceparent("not-a-header") is None
+
+
+def test_errors_are_recorded_on_the_span():
+    with pytest.raises(ValueError):
+        with start_span("read") as span:
+            raise ValueError("bad row")
+    assert read_trace(span.trace_id)[0]["error"] == "ValueError: bad row"
+
+
+def test_celery_headers_carry_context_and_queue_wait():
+    with start_span("enqueue") as enqueue:
+        headers = inject()
+    headers["enqueued_at"] -= 2.0
+    request = SimpleNamespace(headers=headers)  # what an eager task sees
+    assert message_header(request, "traceparent") == enqueue.traceparent
+
+    task_span = begin_span("process_csv_task", parent=message_header(request, "traceparent"))
+    wait = record_queue_wait(request, task_span, "normal")
+    task_span.end()
+
+    assert wait == pytest.approx(2.0, abs=0.5)
+    names = {s["name"]: s for s in read_trace(enqueue.trace_id)}
+    assert names["process_csv_task"]["parent_id"] == enqueue.span_id
+    assert names["queue.wait"]["end_ns"] == names["process_csv_task"]["start_ns"]
+
+
+def test_report_stages_become_spans_only_inside_a_trace(trace_dir):
+    report = ExecutionReport()
+    with report.stage("read"):
+        pass
+    assert list(trace_dir.iterdir()) == []
+
+    with start_span("process_csv_task") as span:
+        with report.stage("write"):
+            pass
+    assert [s["name"] for s in read_trace(span.trace_id)] == ["process_csv_task", "write"]
+
+
+def test_otlp_payload_shape():
+    with start_span("upload", bytes=10, filename="a.csv") as span:
+        pass
+    payload = to_otlp(read_trace(span.trace_id))
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == span.trace_id
+    assert {"key": "bytes", "value": {"intValue": "10"}} in otlp_span["attributes"]
+    assert int(otlp_span["endTimeUnixNano"]) <= time.time_ns()
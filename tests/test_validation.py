@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from worker.src import validation
+from worker.src.validation import check_rows, validate
+
+
+@pytest.fixture
+def people():
+    return pd.DataFrame({
+        "id": [1, 2, 2, 3, None],
+        "email": ["a@b.io", "bad", None, "x@y.io", "q@w.io"],
+        "age": [10, 200, "x", 30, 40],
+        "country": ["US", "DE", "FR", None, "US"],
+    })
+
+
+RULES = [
+    {"check": "not_null", "column": "id"},
+    {"check": "regex", "column": "email", "pattern": r"[^@]+@[^@]+\.[a-z]+"},
+    {"check": "range", "column": "age", "min": 0, "max": 130},
+    {"check": "allowed", "column": "country", "values": ["US", "DE"]},
+    {"check": "unique", "column": "id"},
+]
+
+
+def test_counts_and_sample(people):
+    df, summary = check_rows(people, {"rules": RULES})
+
+    assert df is people  # "report" keeps every row
+    assert [r["violations"] for r in summary["rules"]] == [1, 1, 2, 1, 1]
+    assert summary["rows_failed"] == 3
+    assert summary["sample"][1] == {
+        "row": 2,
+        "failed": ["range:age", "allowed:country", "unique:id"],
+        "values": {"id": 2.0, "email": None, "age": "x", "country": "FR"},
+    }
+
+
+def test_chunked_evaluation_matches_single_pass(people, monkeypatch):
+    _, whole = check_rows(people, {"rules": RULES})
+    monkeypatch.setattr(validation, "VALIDATE_CHUNK_ROWS", 2)
+    _, chunked = check_rows(people, {"rules": RULES})
+    assert chunked == whole
+
+
+def test_drop_keeps_passing_rows(people):
+    out = validate(people, {"rules": RULES, "action": "drop"})
+    assert out.index.tolist() == [0, 3]
+
+
+def test_quarantine_writes_failing_rows_with_reasons(people, tmp_path):
+    path = str(tmp_path / "quarantine.csv")
+    out, summary = check_rows(people, {"rules": RULES, "action": "quarantine"}, path)
+
+    rejected = pd.read_csv(path)
+    assert len(out) == 2 and len(rejected) == 3
+    assert rejected["_failed_rules"].tolist()[0] == "regex:email;range:age"
+    assert summary["quarantine"]["rows"] == 3
+
+
+def test_sample_is_bounded():
+    df = pd.DataFrame({"v": np.arange(10_000)})
+    _, summary = check_rows(df, {"rules": [{"check": "range", "column": "v", "max": 10}],
+                                 "sample_size": 5})
+    assert summary["rows_failed"] == 9989
+    assert [s["row"] for s in summary["sample"]] == [11, 12, 13, 14, 15]
+
+
+def test_regex_without_re2_support_falls_back_to_python():
+    df = pd.DataFrame({"code": ["ab", "ac", "b"]})
+    _, summary = check_rows(df, {"rules": [{"check": "regex", "column": "code", "pattern": r"a(?!c)."}]})
+    assert summary["rules"][0]["violations"] == 2
+
+
+def test_allowed_values_compare_numbers_numerically():
+    df = pd.DataFrame({"level": [1.0, 2.0, 5.0]})
+    _, summary = check_rows(df, {"rules": [{"check": "allowed", "column": "level", "values": ["1", 2]}]})
+    assert summary["rows_failed"] == 1
+
+
+def test_bad_rules_are_rejected(people):
+    with pytest.raises(ValueError):
+        check_rows(people, {"rules": [{"check": "range", "column": "missing"}]})
+    with pytest.raises(ValueError):
+        check_rows(people, {"rules": [{"check": "regex", "column": "email", "pattern": "("}]})
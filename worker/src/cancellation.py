@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+from loguru import logger
+
+from shared.control import pending_signal, clear_signal, CANCEL, PREEMPT
+
+
+CHECKPOINT_DIR = os.path.join("output", "checkpoints")
+
+
+class TaskCancelled(Exception):
+    """The user cancelled the task while it was running"""
+
+
+class TaskPreempted(Exception):
+    """An admin (or a high-priority arrival) asked the task to yield its slot"""
+
+
+def check_signals(task_id):
+    """
+    Cooperative cancellation point. Called between pipeline stages; raises
+    instead of returning so every caller unwinds the same way.
+    """
+    try:
+        signal = pending_signal(task_id)
+    except Exception as e:
+        # a Redis hiccup must not fail the task
+        logger.warning(f"Could not read control signal for {task_id}: {e}")
+        return
+    if signal == CANCEL:
+        raise TaskCancelled(f"Task {task_id} was cancelled")
+    if signal == PREEMPT:
+        clear_signal(task_id)
+        raise TaskPreempted(f"Task {task_id} was preempted")
+
+
+def checkpoint_path(task_id):
+    return os.path.join(CHECKPOINT_DIR, f"{task_id}.pkl")
+
+
+def save_checkpoint(task_id, df):
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    path = checkpoint_path(task_id)
+    df.to_pickle(path)
+    return path
+
+
+def load_checkpoint(path):
+    return pd.read_pickle(path)
+
+
+def remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -1,11 +1,13 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 import os
 
 celery_app = Celery(
     'csv_processor',
     broker=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
     backend=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
-    include=['worker.src.tasks'] 
+    include=['worker.src.tasks', 'worker.src.maintenance', 'worker.src.references',
+             'worker.src.inbox']
 )
 
 celery_app.conf.update(
@@ -15,13 +17,43 @@ celery_app.conf.update(
     timezone='UTC',
     enable_utc=True,
 
+    # Result backend: live progress goes to a small Redis hash per task
+    # (shared/progress.py) and final state to Postgres, so the backend only
+    # holds a tiny final result that expires on its own
+    result_expires=int(os.getenv('RESULT_EXPIRES_SECONDS', 60 * 60)),
+
     # Task settings
-    task_track_started=True,
+    task_track_started=False,
     task_time_limit=30 * 60, 
     task_soft_time_limit=25 * 60,
 
     # Queue settings
     task_default_queue='csv_processing',
+    # Redis emulates priorities with one list per step; 0 is served first
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    task_default_priority=5,
+    # housekeeping never waits behind CSV jobs
+    task_routes={
+        'storage_gc': {'queue': 'maintenance'},
+        'build_reference_table': {'queue': 'maintenance'},
+        'inbox_scan': {'queue': 'maintenance'},
+    },
+
+    # Periodic jobs (run `celery beat` alongside the workers)
+    beat_schedule={
+        'storage-gc': {
+            'task': 'storage_gc',
+            'schedule': float(os.getenv('GC_INTERVAL_SECONDS', 10 * 60)),
+        },
+        'inbox-scan': {
+            'task': 'inbox_scan',
+            'schedule': float(os.getenv('INBOX_SCAN_SECONDS', 30)),
+        },
+    },
 
     # Worker settings
     worker_prefetch_multiplier=1,  # One task at a time
@@ -34,4 +66,35 @@ celery_app.conf.update(
     # This works with the one above. If a worker container crashes or disappears, this setting tells Redis to put that task back in the queue immediately so it doesn't get stuck in a "processing" state forever.
 )
 
-print(f"✅ Celery configured with broker: {celery_app.conf.broker_url}")
+
+
+@worker_init.connect
+def preload_worker_modules(**kwargs):
+    from loguru import logger
+    from worker.src.preload import warm_up
+
+    logger.info(f"✅ Celery configured with broker: {celery_app.conf.broker_url}")
+    warm_up()
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    # Runs once in the parent before the pool forks; children write their
+    # samples to PROMETHEUS_MULTIPROC_DIR and this server merges them.
+    from prometheus_client import start_http_server, CollectorRegistry, multiprocess
+    from shared.metrics import MULTIPROC_DIR
+
+    port = int(os.getenv('WORKER_METRICS_PORT', 9808))
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,212 @@
+import io
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from loguru import logger
+
+
+# Pluggable CSV reader/writer for process_csv_task.
+#
+# pyarrow parses memory-mapped input on all cores and formats output blocks
+# in a thread pool (it releases the GIL). pandas is the reference path: it
+# handles every dialect and encoding, and its output is what results looked
+# like before the engines existed, so it is the default for both; pyarrow
+# is opt-in. Whatever pyarrow can't handle falls back to pandas.
+READ_ENGINE = os.getenv("CSV_READ_ENGINE", "pandas")
+WRITE_ENGINE = os.getenv("CSV_WRITE_ENGINE", "pandas")
+READ_BLOCK_SIZE = int(os.getenv("CSV_READ_BLOCK_BYTES", 4 * 1024 * 1024))
+WRITE_BLOCK_ROWS = int(os.getenv("CSV_WRITE_BLOCK_ROWS", 100_000))
+WRITE_THREADS = int(os.getenv("CSV_WRITE_THREADS", min(8, os.cpu_count() or 1)))
+
+# what pd.read_csv treats as missing, so both readers agree on nulls
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+]
+
+# config dtype name -> pandas dtype; "datetime" is converted after reading
+PANDAS_DTYPES = {
+    "int64": "int64",
+    "float64": "float64",
+    "string": str,
+    "bool": "boolean",
+    "category": "category",
+}
+
+
+ARROW_DTYPES = {
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "string": pa.string(),
+    "bool": pa.bool_(),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "datetime": pa.timestamp("ns"),
+}
+
+
+def _is_utf8(encoding):
+    return encoding.lower().replace("-", "").replace("_", "") == "utf8"
+
+
+def read_csv(source, options=None):
+    """
+    Read `source` (a path, or the CSV itself as bytes) into a DataFrame.
+    `options` is the task config's "csv" section. Returns (df, engine
+    actually used).
+    """
+    options = options or {}
+    engine = options.get("reader") or READ_ENGINE
+    if engine == "pyarrow" and len(options.get("delimiter", ",")) == 1:
+        try:
+            return _read_pyarrow(source, options), "pyarrow"
+        except ValueError as e:
+            # ArrowInvalid is a ValueError: malformed rows, ragged quoting,
+            # a column whose type changes after the first block, ...
+            name = source if isinstance(source, str) else "input"
+            logger.warning(f"pyarrow could not read {name}, using pandas: {e}")
+    return _read_pandas(source, options), "pandas"
+
+
+def _arrow_source(source):
+    if isinstance(source, str):
+        return pa.memory_map(source)
+    return pa.BufferReader(source)
+
+
+def _read_pandas(source, options):
+    dtypes = options.get("dtypes") or {}
+    delimiter = options.get("delimiter", ",")
+    df = pd.read_csv(
+        source if isinstance(source, str) else io.BytesIO(source),
+        # pandas reads longer separators as regexes; ours are literal
+        sep=re.escape(delimiter) if len(delimiter) > 1 else delimiter,
+        engine="python" if len(delimiter) > 1 else None,
+        encoding=options.get("encoding", "utf-8"),
+        dtype={c: PANDAS_DTYPES[t] for c, t in dtypes.items() if t != "datetime"} or None,
+    )
+    for column in [c for c, t in dtypes.items() if t == "datetime"]:
+        # like pyarrow, accept any ISO-8601 variant within one column
+        df[column] = pd.to_datetime(df[column], format="mixed")
+    return df
+
+
+def _read_pyarrow(source, options):
+    column_types = {c: ARROW_DTYPES[t] for c, t in (options.get("dtypes") or {}).items()}
+    read_options = pacsv.ReadOptions(
+        use_threads=True,
+        block_size=READ_BLOCK_SIZE,
+        encoding=options.get("encoding", "utf-8"),
+    )
+    parse_options = pacsv.ParseOptions(delimiter=options.get("delimiter", ","))
+
+    # pandas keeps dates and times as text unless asked to parse them; so
+    # must we, or the result would be rewritten in a different format
+    with pacsv.open_csv(_arrow_source(source), read_options=read_options,
+                        parse_options=parse_options,
+                        convert_options=pacsv.ConvertOptions(column_types=column_types)) as probe:
+        names = probe.schema.names
+        if len(set(names)) != len(names):
+            # pandas renames repeated headers to a, a.1, ...; Arrow keeps both
+            raise ValueError("duplicate column names")
+        for field in probe.schema:
+            if pa.types.is_temporal(field.type) and field.name not in column_types:
+                column_types[field.name] = pa.string()
+
+    table = pacsv.read_csv(
+        _arrow_source(source),
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        ),
+    )
+    nullable_bools = [f.name for f in table.schema
+                      if pa.types.is_boolean(f.type) and table.column(f.name).null_count]
+    # hand the Arrow buffers over column by column instead of holding both
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    for column in nullable_bools:
+        # object columns: pandas fills the gaps with NaN, Arrow with None
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
+
+
+def iter_csv_blocks(df, options=None, header=True):
+    """
+    Serialise `df` as CSV in blocks of WRITE_BLOCK_ROWS rows. Returns
+    (engine, iterator of bytes), so callers can stream a result without
+    building it in memory.
+    """
+    options = options or {}
+    engine = options.get("writer") or WRITE_ENGINE
+    delimiter = options.get("delimiter", ",")
+    encoding = options.get("encoding", "utf-8")
+    if engine == "pyarrow" and len(delimiter) == 1 and _is_utf8(encoding):
+        try:
+            return "pyarrow", _arrow_blocks(df, delimiter, header)
+        except (ValueError, TypeError) as e:
+            # mixed-type object columns can't be converted to Arrow
+            logger.warning(f"pyarrow could not write this frame, using pandas: {e}")
+    return "pandas", _pandas_blocks(df, delimiter, encoding, header)
+
+
+def _pandas_blocks(df, delimiter, encoding, header):
+    if df.empty:
+        if header:
+            yield df.to_csv(index=False, sep=delimiter).encode(encoding)
+        return
+    for start in range(0, len(df), WRITE_BLOCK_ROWS):
+        block = df.iloc[start:start + WRITE_BLOCK_ROWS]
+        yield block.to_csv(
+            index=False, header=header and start == 0, sep=delimiter).encode(encoding)
+
+
+def _arrow_blocks(df, delimiter, header):
+    # convert up front so a conversion error surfaces before any bytes are
+    # written and the caller can still fall back to pandas
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    batches = table.to_batches(max_chunksize=WRITE_BLOCK_ROWS)
+    if not batches and header:
+        batches = [table.slice(0, 0)]
+    return _format_in_threads(batches, delimiter, header)
+
+
+def _format_batch(batch, include_header, delimiter):
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(batch, sink, pacsv.WriteOptions(
+        include_header=include_header, delimiter=delimiter))
+    return sink.getvalue().to_pybytes()
+
+
+def _format_in_threads(batches, delimiter, header):
+    # at most 2 * WRITE_THREADS formatted blocks wait to be written, in order
+    with ThreadPoolExecutor(WRITE_THREADS) as pool:
+        pending = deque()
+        for i, batch in enumerate(batches):
+            pending.append(pool.submit(_format_batch, batch, header and i == 0, delimiter))
+            if len(pending) >= 2 * WRITE_THREADS:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_csv(df, path, options=None, append=False):
+    """
+    Write `df` to `path` block by block; returns the engine used. With
+    `append` the rows are added to the end of an existing file, without a
+    header.
+    """
+    engine, blocks = iter_csv_blocks(df, options, header=not append)
+    with open(path, "ab" if append else "wb", buffering=io.DEFAULT_BUFFER_SIZE * 16) as f:
+        for block in blocks:
+            f.write(block)
+    return engine
@@ -0,0 +1,242 @@
+import os
+import hashlib
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from shared.db_models import Task
+from shared.storage import OUTPUT_DIR
+from worker.src.csv_io import read_csv, write_csv
+
+
+# Continue mode for sources that only ever grow (daily logs). A run records
+# how far into the file it got; the next run on the re-uploaded file checks
+# that the old part is unchanged and parses only the bytes after it.
+STATE_DIR = os.path.join(OUTPUT_DIR, "state")
+# bytes before the offset that must match for the new file to count as an
+# append; hashing the whole prefix would cost as much as reprocessing it
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def is_incremental(config):
+    return bool(config and (config.get("incremental") or config.get("continue_from")))
+
+
+def state_dir(task_id):
+    return os.path.join(STATE_DIR, task_id)
+
+
+def _fingerprint(f, offset):
+    start = max(0, offset - FINGERPRINT_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def _row_hashes(df, subset):
+    """
+    64-bit hash per row of `subset`. Numbers are hashed as float64 and
+    everything else as text, so a column read as int in one run and float in
+    the next (because of a blank) still hashes the same.
+    """
+    columns = {}
+    for column in subset:
+        values = df[column]
+        if values.dtype.kind in "iufb":
+            columns[column] = values.astype("float64")
+        else:
+            columns[column] = values.astype("string")
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def remove_duplicates(df, params, state):
+    """Drop rows already seen in this or any earlier run (keep="first" only)"""
+    if params.get("keep", "first") != "first":
+        raise ValueError("Continue mode only supports remove_duplicates with keep='first'")
+    subset = params.get("subset") or list(df.columns)
+    hashes = _row_hashes(df, subset)
+    seen = state.get("seen", np.empty(0, dtype=np.uint64))
+
+    fresh = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, seen)
+    state["seen"] = np.union1d(seen, hashes[fresh])
+    logger.info(f"removed {len(df) - int(fresh.sum())} duplicates across runs")
+    return df[fresh]
+
+
+def fill_missing(df, params, state):
+    """fill_missing whose "mean" is over every row seen so far, not just this delta"""
+    if params.get("method") != "mean":
+        return None
+    sums = state.setdefault("sums", {})
+    counts = state.setdefault("counts", {})
+    df = df.copy(deep=False)
+    for column in params.get("columns", []):
+        if column not in df.columns:
+            continue
+        values = df[column]
+        sums[column] = sums.get(column, 0.0) + float(values.sum())
+        counts[column] = counts.get(column, 0) + int(values.count())
+        if counts[column]:
+            df[column] = values.fillna(sums[column] / counts[column])
+    return df
+
+
+# operations whose result depends on rows outside the current delta
+STATEFUL_OPS = {
+    "remove_duplicates": remove_duplicates,
+    "fill_missing": fill_missing,
+}
+
+
+def previous_run(db, task_id):
+    """The completed task a continue-mode task picks up from"""
+    previous = db.query(Task).filter(Task.id == task_id).first()
+    if not previous or previous.status != "completed" or not previous.delta_state:
+        raise ValueError(
+            f"Task {task_id} has no continue state (not completed, not incremental or purged)")
+    return previous
+
+
+class DeltaRun:
+    """
+    One continue-mode run of process_csv_task.
+
+    Usage:
+        delta = DeltaRun(task, previous)   # previous=None starts a chain
+        df, engine = delta.read(csv_options)
+        df = delta.apply(i, op_name, params, df, handler)
+        delta.write(df, path, csv_options)
+        task.delta_state = delta.finish()
+    """
+
+    def __init__(self, task, previous=None):
+        self.task = task
+        self.previous = previous
+        state = previous.delta_state if previous else {}
+        if previous and previous.config.get("operations") != task.config.get("operations"):
+            raise ValueError(f"Continue mode needs the same operations as task {previous.id}")
+
+        self.offset = state.get("offset", 0)
+        # raw header bytes, kept as latin-1 text so any encoding round-trips
+        self.header = state.get("header", "").encode("latin-1")
+        self.rows_total = state.get("rows_total", 0)
+        self.float_columns = set(state.get("float_columns", []))
+        self.ops = [self._load_op_state(op) for op in state.get("ops", [])]
+        self.mode = task.config.get("delta_output", "delta")
+        # (previous result path, its size) while an append is not yet final
+        self.appended_to = None
+
+    @staticmethod
+    def _load_op_state(op):
+        op = dict(op)
+        if "seen_path" in op:
+            if not os.path.exists(op["seen_path"]):
+                raise ValueError("Continue state of the previous task was purged")
+            op["seen"] = np.load(op.pop("seen_path"))
+        return op
+
+    def read(self, options):
+        """Parse the complete lines appended since the previous run"""
+        with open(self.task.file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.previous:
+                if size < self.offset or \
+                        _fingerprint(f, self.offset) != self.previous.delta_state["fingerprint"]:
+                    raise ValueError(
+                        f"Upload does not continue task {self.previous.id}: "
+                        f"the file was rewritten, not appended to")
+                f.seek(self.offset)
+                data = f.read()
+            else:
+                data = f.read()
+                header_end = data.find(b"\n") + 1 or len(data)
+                self.header, data = data[:header_end], data[header_end:]
+                self.offset = header_end
+
+            # a trailing line without a newline may still be being written;
+            # it is picked up by the next run
+            complete = data.rfind(b"\n") + 1
+            self.new_offset = self.offset + complete
+            self.fingerprint = _fingerprint(f, self.new_offset)
+
+        df, engine = read_csv(self.header + data[:complete], options)
+        # a column that had blanks before is float for good; keep writing
+        # it as such even when this delta happens to have none
+        for column in self.float_columns & set(df.columns):
+            if df[column].dtype.kind in "iu":
+                df[column] = df[column].astype("float64")
+        self.float_columns |= {c for c in df.columns if df[c].dtype.kind == "f"}
+        self.rows_in = len(df)
+        logger.info(
+            f"Continue mode: {complete} new bytes, {len(df)} rows "
+            f"(skipped {self.offset} bytes already processed)")
+        return df, engine
+
+    def apply(self, index, op_name, params, df, handler):
+        while len(self.ops) <= index:
+            self.ops.append({})
+        stateful = STATEFUL_OPS.get(op_name)
+        if stateful:
+            result = stateful(df, params, self.ops[index])
+            if result is not None:
+                return result
+        return handler(df, params)
+
+    def write(self, df, path, options):
+        """
+        Write the delta, or in append mode extend the previous result: its
+        file is moved to `path` and the delta appended in place, so the rows
+        already written are never copied. The previous task gives the file up
+        in finish(); until then restore() puts it back.
+        """
+        if self.mode == "append" and self.previous:
+            source = self.previous.result_path
+            if not source or not os.path.exists(source):
+                raise ValueError(
+                    f"Result of task {self.previous.id} is gone (purged, or extended by a "
+                    f"later run); cannot append")
+            self.appended_to = (source, os.path.getsize(source))
+            os.replace(source, path)
+            try:
+                return write_csv(df, path, options, append=True)
+            except BaseException:
+                self.restore(path)
+                raise
+        return write_csv(df, path, options)
+
+    def restore(self, path):
+        """Cut what write() appended off `path` and give it back to the previous task"""
+        if not self.appended_to or not os.path.exists(path):
+            return
+        source, size = self.appended_to
+        os.truncate(path, size)
+        os.replace(path, source)
+        self.appended_to = None
+
+    def finish(self):
+        """Persist the carried state and return what goes in Task.delta_state"""
+        if self.appended_to:
+            # the result now belongs to this task
+            self.previous.result_path = None
+            self.previous.result_sha256 = None
+            self.previous.result_size = None
+            self.appended_to = None
+        ops = []
+        for index, op in enumerate(self.ops):
+            op = dict(op)
+            if "seen" in op:
+                os.makedirs(state_dir(self.task.id), exist_ok=True)
+                path = os.path.join(state_dir(self.task.id), f"op{index}_seen.npy")
+                np.save(path, op.pop("seen"))
+                op["seen_path"] = path
+            ops.append(op)
+        return {
+            "continued_from": self.previous.id if self.previous else None,
+            "offset": self.new_offset,
+            "fingerprint": self.fingerprint,
+            "header": self.header.decode("latin-1"),
+            "rows_in": self.rows_in,
+            "rows_total": self.rows_total + self.rows_in,
+            "float_columns": sorted(self.float_columns),
+            "ops": ops,
+        }
@@ -0,0 +1,238 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from worker.src.celery_app import celery_app
+from shared.db_models import Task, Pipeline, InboxFile
+from shared.storage import store_upload
+from shared.control import PRIORITIES
+from shared.task_signatures import process_csv, process_csv_batch
+from shared.tracing import start_span, inject
+
+
+# Files dropped into inbox/<pipeline name>/ are processed with that saved
+# pipeline. Scans run from Celery beat every INBOX_SCAN_SECONDS.
+INBOX_DIR = os.getenv("INBOX_DIR", "inbox")
+# watermark: only files untouched for this long are complete enough to take
+INBOX_SETTLE_SECONDS = float(os.getenv("INBOX_SETTLE_SECONDS", 10))
+# small files found in one scan share a Celery job, up to these limits
+INBOX_BATCH_MAX_FILES = int(os.getenv("INBOX_BATCH_MAX_FILES", 20))
+INBOX_BATCH_MAX_BYTES = int(os.getenv("INBOX_BATCH_MAX_BYTES", 16 * 1024 * 1024))
+# a claim older than this without an ingested task is taken over again, and
+# an ingested task still not handed to the broker after this is re-published
+INBOX_CLAIM_TIMEOUT = float(os.getenv("INBOX_CLAIM_TIMEOUT_SECONDS", 15 * 60))
+
+
+def settled_files(directory, watermark):
+    """(name, size, mtime_ns) of CSVs last modified before `watermark`, oldest first"""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            # dotfiles are partial copies (rsync, editors); subdirectories are ignored
+            if entry.name.startswith(".") or not entry.name.endswith(".csv") \
+                    or not entry.is_file():
+                continue
+            st = entry.stat()
+            if st.st_mtime <= watermark:
+                entries.append((entry.name, st.st_size, st.st_mtime_ns))
+    return sorted(entries, key=lambda e: e[2])
+
+
+def micro_batches(entries, max_files=None, max_bytes=None):
+    """Group entries whose second item is a size; a file over max_bytes runs alone"""
+    max_files = max_files or INBOX_BATCH_MAX_FILES
+    max_bytes = max_bytes or INBOX_BATCH_MAX_BYTES
+    batches, current, current_bytes = [], [], 0
+    for entry in entries:
+        size = entry[1]
+        if current and (len(current) >= max_files or current_bytes + size > max_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(entry)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def claim(db, pipeline, entry):
+    """Return the ledger row if this scan now owns the file, else None"""
+    name, size, mtime_ns = entry
+    row = InboxFile(pipeline=pipeline, name=name, size=size, mtime_ns=mtime_ns,
+                    status="claimed", claimed_at=datetime.now())
+    db.add(row)
+    try:
+        db.commit()
+        return row
+    except IntegrityError:
+        db.rollback()
+
+    existing = db.query(InboxFile).filter_by(
+        pipeline=pipeline, name=name, size=size, mtime_ns=mtime_ns).first()
+    if existing is None:
+        return None
+    if existing.status == "ingested":
+        # ingested, but the scan died before removing the file
+        _remove_quietly(os.path.join(INBOX_DIR, pipeline, name))
+        return None
+    # a scan that claimed the file and never finished: take it over, once
+    stale = datetime.now() - timedelta(seconds=INBOX_CLAIM_TIMEOUT)
+    taken = db.execute(
+        update(InboxFile)
+        .where(InboxFile.id == existing.id, InboxFile.status == "claimed",
+               InboxFile.claimed_at < stale)
+        .values(claimed_at=datetime.now())
+    ).rowcount
+    db.commit()
+    return existing if taken else None
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def ingest(db, pipeline, row):
+    """Copy a claimed file into uploads/ and create its queued Task"""
+    path = os.path.join(INBOX_DIR, pipeline.name, row.name)
+    task_id = str(uuid.uuid4())
+    # each file starts its own trace, like an upload through the API
+    with start_span("inbox.ingest", task_id=task_id, pipeline=pipeline.name,
+                    file=row.name, bytes=row.size) as span:
+        with open(path, "rb") as f:
+            file_path, sha256, size = store_upload(f, task_id)
+
+    db.add(Task(
+        id=task_id,
+        filename=f"{task_id}.csv",
+        original_filename=row.name,
+        status="queued",
+        queued_at=datetime.now(),
+        file_path=file_path,
+        upload_sha256=sha256,
+        upload_size=size,
+        config=pipeline.config,
+        created_at=datetime.now(),
+        traceparent=span.traceparent,
+    ))
+    row.status = "ingested"
+    row.task_id = task_id
+    db.commit()
+    # the content now lives in the upload store
+    _remove_quietly(path)
+    return task_id
+
+
+def enqueue(db, task_ids, config):
+    """One Celery message for the whole batch"""
+    priority = PRIORITIES[(config or {}).get("priority", "normal")]
+    if len(task_ids) == 1:
+        signature = process_csv(task_ids[0], priority)
+    else:
+        signature = process_csv_batch(task_ids, priority)
+    tasks = db.query(Task).filter(Task.id.in_(task_ids)).all()
+    try:
+        result = signature.apply_async(headers=inject())
+    except Exception as e:
+        # the tasks stay queued without a message; a later scan re-publishes them
+        logger.error(f"Failed to queue inbox tasks {task_ids}: {e}")
+        return None
+    for task in tasks:
+        task.celery_task_id = result.id
+    db.commit()
+    return result.id
+
+
+def republish_orphans(db):
+    """
+    Publish inbox tasks that were ingested but never reached the broker: the
+    scan died between committing the task and publishing it, or the publish
+    failed. Each one is taken with a conditional update first, so two
+    overlapping scans don't both send it. Returns how many were sent.
+    """
+    stale = datetime.now() - timedelta(seconds=INBOX_CLAIM_TIMEOUT)
+    waiting_since = func.coalesce(Task.queued_at, Task.created_at)
+    orphans = (
+        db.query(Task)
+        .join(InboxFile, InboxFile.task_id == Task.id)
+        .filter(InboxFile.status == "ingested", Task.status == "queued",
+                Task.celery_task_id.is_(None), waiting_since < stale)
+        .all()
+    )
+    sent = 0
+    for task in orphans:
+        taken = db.execute(
+            update(Task)
+            .where(Task.id == task.id, Task.status == "queued", Task.celery_task_id.is_(None),
+                   waiting_since < stale)
+            .values(queued_at=datetime.now())
+        ).rowcount
+        db.commit()
+        if taken and enqueue(db, [task.id], task.config):
+            sent += 1
+    if orphans:
+        logger.warning(f"inbox_scan re-published {sent} of {len(orphans)} unsent inbox tasks")
+    return sent
+
+
+@celery_app.task(name='inbox_scan', queue='maintenance', ignore_result=True)
+def inbox_scan():
+    """
+    Pick up settled files from inbox/<pipeline>/ (scheduled by Celery beat).
+
+    1. list files older than the watermark (now - INBOX_SETTLE_SECONDS)
+    2. claim each one in the inbox_files ledger, so it is processed once
+    3. copy it to uploads/, create its Task and delete it from the inbox
+    4. queue the tasks in micro-batches of up to INBOX_BATCH_MAX_FILES files
+       or INBOX_BATCH_MAX_BYTES bytes per Celery job
+    5. re-publish tasks an earlier scan created but never queued
+    """
+    from api.src.database import get_db
+
+    if not os.path.isdir(INBOX_DIR):
+        return
+    watermark = time.time() - INBOX_SETTLE_SECONDS
+    db = next(get_db())
+    stats = {"files": 0, "jobs": 0, "republished": 0}
+
+    try:
+        for name in sorted(os.listdir(INBOX_DIR)):
+            directory = os.path.join(INBOX_DIR, name)
+            if not os.path.isdir(directory):
+                continue
+            pipeline = db.get(Pipeline, name)
+            if not pipeline:
+                logger.warning(f"Inbox folder '{name}' has no saved pipeline; skipping")
+                continue
+
+            claimed = [row for row in (claim(db, name, entry)
+                                       for entry in settled_files(directory, watermark)) if row]
+            batches = micro_batches([(row, row.size) for row in claimed])
+            for batch in batches:
+                task_ids = []
+                for row, _ in batch:
+                    try:
+                        task_ids.append(ingest(db, pipeline, row))
+                    except FileNotFoundError:
+                        logger.warning(f"Inbox file {name}/{row.name} vanished before pickup")
+                        db.delete(row)
+                        db.commit()
+                if not task_ids:
+                    continue
+                enqueue(db, task_ids, pipeline.config)
+                stats["files"] += len(task_ids)
+                stats["jobs"] += 1
+
+        stats["republished"] = republish_orphans(db)
+        if stats["files"]:
+            logger.info(f"📥 inbox_scan queued {stats['files']} files in {stats['jobs']} jobs")
+        return stats
+    finally:
+        db.close()
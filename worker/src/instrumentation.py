@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import resource
+import threading
+from contextlib import contextmanager
+
+from shared.metrics import (
+    STAGE_SECONDS, STAGE_CPU_SECONDS, STAGE_ROWS, STAGE_MEMORY_BYTES, QUEUE_WAIT_SECONDS
+)
+from shared.tracing import begin_span, current_span, message_header, record_span
+
+
+# a stage's peak memory is sampled from RSS this often on a helper thread;
+# allocations freed again within one interval can be missed
+MEMORY_SAMPLE_SECONDS = float(os.getenv("STAGE_MEMORY_SAMPLE_MS", 5)) / 1000
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _peak_rss_bytes():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _current_rss_bytes():
+    """Resident set size right now, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler:
+    """
+    Highest RSS seen while a stage runs. ru_maxrss is a high-water mark for
+    the whole process, so in a reused prefork child it only moves when a
+    stage beats every earlier task; sampling gives each stage its own peak.
+    """
+
+    def __init__(self, interval=MEMORY_SAMPLE_SECONDS):
+        self.start = self.peak = _current_rss_bytes()
+        self._stopped = threading.Event()
+        self._thread = None
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+            self._thread.start()
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            self._sample()
+
+    def _sample(self):
+        rss = _current_rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def stop(self):
+        """Bytes the stage's peak RSS rose above its starting RSS, or None"""
+        if self._thread is None:
+            return None
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+        return max(0, self.peak - self.start)
+
+
+def _shape(df):
+    if df is None:
+        return None, None
+    return len(df), len(df.columns)
+
+
+class ExecutionReport:
+    """
+    Collects one record per pipeline stage of a process_csv_task run.
+
+    Usage:
+        report = ExecutionReport()
+        with report.stage("read") as stage:
+            df = pd.read_csv(path)
+            stage.output(df)
+        task.execution_report = report.to_dict()
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.started = time.perf_counter()
+        self.queue_wait_seconds = None
+
+    @contextmanager
+    def stage(self, name, df_in=None, operation=None):
+        record = _StageRecord(name, df_in, operation)
+        self.stages.append(record.data)
+        # inside a traced task every stage is also a child span
+        span = begin_span(name, operation=operation) if current_span() else None
+        try:
+            yield record
+        except Exception as e:
+            record.data["error"] = str(e)[:200]
+            raise
+        finally:
+            record.finish()
+            if span:
+                span.set(**{k: v for k, v in record.data.items()
+                            if k not in ("stage", "operation", "error")})
+                span.end(error=sys.exc_info()[1])
+
+    def to_dict(self):
+        data = {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "stages": self.stages,
+        }
+        if self.queue_wait_seconds is not None:
+            data["queue_wait_seconds"] = self.queue_wait_seconds
+        return data
+
+
+def record_queue_wait(request, span, priority):
+    """
+    Time the Celery message spent between publish and this worker picking
+    it up, from the `enqueued_at` header set by shared.tracing.inject().
+    Adds a queue.wait span ending where `span` starts. Returns seconds, or
+    None for messages without the header (sent by older releases).
+    """
+    enqueued_at = message_header(request, "enqueued_at")
+    if enqueued_at is None:
+        return None
+    start_ns = int(float(enqueued_at) * 1e9)
+    # clocks of the API and worker hosts may disagree slightly
+    wait = max(0.0, (span.start_ns - start_ns) / 1e9)
+    record_span("queue.wait", min(start_ns, span.start_ns), span.start_ns,
+                parent=span, priority=priority)
+    QUEUE_WAIT_SECONDS.labels(priority=priority).observe(wait)
+    return round(wait, 4)
+
+
+class _StageRecord:
+    def __init__(self, name, df_in, operation):
+        rows_in, cols_in = _shape(df_in)
+        self.name = name
+        self.data = {
+            "stage": name,
+            "operation": operation,
+            "rows_in": rows_in,
+            "columns_in": cols_in,
+            "rows_out": None,
+            "columns_out": None,
+        }
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._peak = _peak_rss_bytes()
+        self._sampler = _RssSampler()
+
+    def output(self, df):
+        self.data["rows_out"], self.data["columns_out"] = _shape(df)
+
+    def note(self, **fields):
+        """Attach extra fields (e.g. the CSV engine used) to the record"""
+        self.data.update(fields)
+
+    def finish(self):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        peak_delta = self._sampler.stop()
+        if peak_delta is None:
+            # no /proc (macOS): growth of the process high-water mark only
+            peak_delta = max(0, _peak_rss_bytes() - self._peak)
+
+        self.data["wall_seconds"] = round(wall, 4)
+        self.data["cpu_seconds"] = round(cpu, 4)
+        self.data["peak_memory_delta_mb"] = round(peak_delta / 1024**2, 2)
+
+        # operations are labelled by name, so the label set stays bounded
+        label = self.data["operation"] or self.name
+        STAGE_SECONDS.labels(stage=label).observe(wall)
+        STAGE_CPU_SECONDS.labels(stage=label).observe(cpu)
+        STAGE_MEMORY_BYTES.labels(stage=label).observe(peak_delta)
+        if self.data["rows_in"] is not None:
+            STAGE_ROWS.labels(stage=label).observe(self.data["rows_in"])
@@ -0,0 +1,184 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from loguru import logger
+
+from worker.src.celery_app import celery_app
+from shared.db_models import Task
+from shared.storage import (
+    release_file, release_tree, result_dir, orphan_blobs, stale_temp_files
+)
+from worker.src.profiling import PROFILE_DIR
+from worker.src.cancellation import checkpoint_path
+from worker.src.delta import state_dir
+from shared.progress import clear_progress, read_progress
+from shared.tracing import trace_path
+
+
+# Days to keep a task's files, by status. 0 keeps them forever. Pending
+# tasks are uploads that were never configured.
+RETENTION_DAYS = {
+    "completed": float(os.getenv("RETENTION_DAYS_COMPLETED", 7)),
+    "failed": float(os.getenv("RETENTION_DAYS_FAILED", 3)),
+    "cancelled": float(os.getenv("RETENTION_DAYS_CANCELLED", 1)),
+    "pending": float(os.getenv("RETENTION_DAYS_PENDING", 2)),
+}
+# Cap on uploads + results; oldest finished tasks are purged first. 0 = no cap
+STORAGE_MAX_GB = float(os.getenv("STORAGE_MAX_GB", 0))
+# Tasks purged per run, so one run never monopolises the shared volumes
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", 200))
+# Queued or processing tasks with no sign of life (queued, started or a
+# progress update) for this many task time limits are failed, so retention
+# can collect them: their worker died or their broker message was lost
+STALE_TASK_FACTOR = float(os.getenv("STALE_TASK_FACTOR", 4))
+
+FINISHED = ["completed", "failed", "cancelled"]
+
+
+def purge_task(task):
+    """Release every file a task owns and return the bytes actually freed"""
+    freed = 0
+    if task.file_path:
+        freed += release_file(task.file_path)
+    freed += release_tree(result_dir(task.id))
+    if task.result_path and os.path.exists(task.result_path):
+        # results written before per-task directories existed
+        freed += release_file(task.result_path)
+    for suffix in (".speedscope.json", ".collapsed.txt"):
+        freed += release_file(os.path.join(PROFILE_DIR, task.id + suffix))
+    freed += release_file(checkpoint_path(task.id))
+    freed += release_tree(state_dir(task.id))
+    if task.trace_id:
+        freed += release_file(trace_path(task.trace_id))
+    forget_task_state(task)
+
+    task.file_path = None
+    task.result_path = None
+    task.profile_path = None
+    task.delta_state = None  # nothing left to continue from
+    task.purged_at = datetime.now()
+    return freed
+
+
+def forget_task_state(task):
+    """Drop what Redis still holds for a task: progress hash and Celery result"""
+    try:
+        clear_progress(task.id)
+        if task.celery_task_id:
+            celery_app.AsyncResult(task.celery_task_id).forget()
+    except Exception as e:
+        logger.warning(f"Could not clear Redis state for {task.id}: {e}")
+
+
+def stored_bytes(db):
+    """Bytes held by unpurged tasks: each distinct upload once, plus results"""
+    live = Task.purged_at.is_(None)
+    results = db.query(func.coalesce(func.sum(Task.result_size), 0)).filter(live).scalar()
+    uploads = db.query(Task.upload_sha256, func.max(Task.upload_size)).filter(
+        live, Task.upload_sha256.isnot(None)).group_by(Task.upload_sha256).all()
+    return int(results) + sum(size or 0 for _, size in uploads)
+
+
+def expired_tasks(db, now, limit):
+    """Tasks past their status' retention period, oldest first"""
+    tasks = []
+    for status, days in RETENTION_DAYS.items():
+        if days <= 0 or len(tasks) >= limit:
+            continue
+        age_column = Task.created_at if status == "pending" else Task.completed_at
+        tasks += db.query(Task).filter(
+            Task.status == status,
+            Task.purged_at.is_(None),
+            age_column < now - timedelta(days=days),
+        ).order_by(age_column).limit(limit - len(tasks)).all()
+    return tasks
+
+
+def abandon_stale_tasks(db, now, limit):
+    """Fail tasks stuck queued or processing; returns how many were failed"""
+    if STALE_TASK_FACTOR <= 0:
+        return 0
+    limit_seconds = STALE_TASK_FACTOR * celery_app.conf.task_time_limit
+    cutoff = now - timedelta(seconds=limit_seconds)
+    candidates = db.query(Task).filter(
+        Task.status.in_(["queued", "processing"]),
+        func.coalesce(Task.queued_at, Task.created_at) < cutoff,
+        (Task.started_at.is_(None)) | (Task.started_at < cutoff),
+    ).order_by(Task.created_at).limit(limit).all()
+
+    abandoned = 0
+    for task in candidates:
+        try:
+            progress = read_progress(task.id)
+        except Exception as e:
+            # without Redis a live task can't be told from a dead one
+            logger.warning(f"storage_gc: could not read progress, skipping stale tasks: {e}")
+            break
+        if progress and progress["updated"] >= cutoff.timestamp():
+            continue
+        logger.warning(f"Task {task.id} stuck {task.status} since before {cutoff}; marking it failed")
+        task.error_message = (f"Abandoned: no progress for {limit_seconds / 3600:g}h while "
+                              f"{task.status} (worker lost or broker message dropped)")
+        task.status = "failed"
+        task.completed_at = now
+        db.commit()
+        abandoned += 1
+    return abandoned
+
+
+@celery_app.task(name='storage_gc', queue='maintenance', ignore_result=True)
+def storage_gc():
+    """
+    Periodic storage compaction (scheduled by Celery beat).
+
+    0. fail tasks stuck queued or processing (see STALE_TASK_FACTOR); they
+       are then purged like any failed task
+    1. purge tasks past their retention period
+    2. if still above STORAGE_MAX_GB, purge the oldest finished tasks
+    3. delete upload blobs no task links to and stale upload temp files
+
+    Each task is purged and committed on its own and at most GC_BATCH_SIZE
+    tasks are handled per run; the rest waits for the next run.
+    """
+    from api.src.database import get_db
+
+    db = next(get_db())
+    now = datetime.now()
+    stats = {"purged": 0, "freed_bytes": 0, "orphans": 0, "abandoned": 0}
+
+    try:
+        stats["abandoned"] = abandon_stale_tasks(db, now, GC_BATCH_SIZE)
+        for task in expired_tasks(db, now, GC_BATCH_SIZE):
+            stats["freed_bytes"] += purge_task(task)
+            stats["purged"] += 1
+            db.commit()
+
+        if STORAGE_MAX_GB > 0:
+            budget = STORAGE_MAX_GB * 1024**3
+            over = stored_bytes(db) - budget
+            if over > 0:
+                candidates = db.query(Task).filter(
+                    Task.status.in_(FINISHED), Task.purged_at.is_(None)
+                ).order_by(Task.completed_at).limit(
+                    max(0, GC_BATCH_SIZE - stats["purged"])).all()
+                for task in candidates:
+                    if over <= 0:
+                        break
+                    # count the task's nominal size against the budget even
+                    # when its upload blob is still shared with other tasks
+                    over -= (task.result_size or 0) + (task.upload_size or 0)
+                    stats["freed_bytes"] += purge_task(task)
+                    stats["purged"] += 1
+                    db.commit()
+
+        for path in list(orphan_blobs()) + list(stale_temp_files()):
+            stats["freed_bytes"] += release_file(path)
+            stats["orphans"] += 1
+
+        logger.info(
+            f"🧹 storage_gc failed {stats['abandoned']} stale tasks, "
+            f"purged {stats['purged']} tasks, removed {stats['orphans']} "
+            f"orphan files, freed {stats['freed_bytes'] / 1024**2:.1f} MB")
+        return stats
+    finally:
+        db.close()
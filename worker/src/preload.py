@@ -0,0 +1,23 @@
+import gc
+import io
+
+
+def warm_up():
+    """
+    Import and exercise the heavy modules once in the worker parent, before
+    the prefork pool starts. Children (including the ones recycled every
+    worker_max_tasks_per_child tasks) inherit them already initialised
+    instead of paying the import on their first task.
+    """
+    import pandas as pd
+    import worker.src.tasks  # noqa: F401  registers tasks, imports handlers
+
+    # pandas defers parts of its CSV parser/formatter until first use
+    df = pd.read_csv(io.StringIO("a,b\n1,x\n1,x\n2,\n"))
+    df = df.drop_duplicates().dropna()
+    df.to_csv(io.StringIO(), index=False)
+
+    # move everything imported so far out of the collector's reach, so the
+    # children's GC passes don't write to (and un-share) the parent's pages
+    gc.collect()
+    gc.freeze()
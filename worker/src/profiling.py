@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+
+# Fraction of tasks profiled even when their config doesn't ask for it, so a
+# slow production file leaves a profile behind without being re-run.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000
+PROFILE_DIR = os.path.join("output", "profiles")
+
+
+def should_profile(config):
+    if isinstance(config, dict) and config.get("profile"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread.
+
+    A daemon thread wakes up every `interval` seconds, grabs the target
+    thread's current frame from sys._current_frames() and counts the stack.
+    The profiled code is never traced, so the overhead is one stack walk per
+    sample (well under 1% at the default 10ms).
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # root first, like every flame graph tool expects
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format: `a;b;c <count>` per line"""
+        return "\n".join(
+            f"{';'.join(stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        ) + "\n"
+
+    def speedscope(self, name="process_csv_task"):
+        """A sampled profile in speedscope's JSON file format"""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(round(count * self.interval, 6))
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "csv-processor sampling profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def save(self, task_id, directory=PROFILE_DIR):
+        """Write both formats next to the results; returns the speedscope path"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, task_id)
+        with open(f"{base}.collapsed.txt", "w") as f:
+            f.write(self.collapsed())
+        with open(f"{base}.speedscope.json", "w") as f:
+            json.dump(self.speedscope(name=f"task {task_id}"), f)
+        return f"{base}.speedscope.json"
@@ -0,0 +1,227 @@
+import contextvars
+import os
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from loguru import logger
+
+from worker.src.celery_app import celery_app
+from shared.db_models import ReferenceTable
+from shared.storage import reference_path, release_file
+
+
+# Reference tables are stored as uncompressed Arrow IPC files and opened with
+# mmap, so every worker process on a host reads the same page-cache pages and
+# only the columns a lookup touches are ever paged in.
+REFERENCE_CACHE_SIZE = int(os.getenv("REFERENCE_CACHE_SIZE", 8))
+
+
+def build_reference_file(csv_path, arrow_path):
+    """Convert a CSV to an Arrow IPC file; returns (rows, column names)"""
+    table = pacsv.read_csv(csv_path)  # multithreaded parse
+    partial_path = f"{arrow_path}.part"
+    with pa.OSFile(partial_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(partial_path, arrow_path)
+    return table.num_rows, table.schema.names
+
+
+@celery_app.task(name='build_reference_table', queue='maintenance', ignore_result=True)
+def build_reference_table(name, sha256):
+    from api.src.database import get_db
+    db = next(get_db())
+    try:
+        ref = db.get(ReferenceTable, name)
+        if not ref or ref.sha256 != sha256:
+            logger.info(f"Reference table {name} was replaced or deleted; skipping build")
+            return
+        try:
+            target = reference_path(name, sha256)
+            rows, columns = build_reference_file(ref.source_path, target)
+        except Exception as e:
+            logger.error(f"❌ Could not build reference table {name}: {e}")
+            ref.status = "failed"
+            ref.error_message = str(e)
+            ref.updated_at = datetime.now()
+            db.commit()
+            return
+
+        previous, source = ref.path, ref.source_path
+        ref.path = target
+        ref.rows = rows
+        ref.columns = columns
+        ref.status = "ready"
+        ref.error_message = None
+        ref.source_path = None
+        ref.updated_at = datetime.now()
+        db.commit()
+
+        # processes that still map the previous version keep its inode alive
+        release_file(source)
+        if previous and previous != target:
+            release_file(previous)
+        logger.info(f"📚 Reference table {name} ready: {rows} rows, {len(columns)} columns")
+    finally:
+        db.close()
+
+
+def _is_numeric(dtype):
+    return dtype.kind in "iufb"
+
+
+def _as_text(values):
+    """
+    Key values as text for mixed-type matching. Whole floats (an int column
+    read as float because of a blank) are written without ".0", and nulls
+    stay null rather than becoming "nan".
+    """
+    text = values.astype("string")
+    if values.dtype.kind == "f":
+        # exactly representable whole numbers; NaN and inf compare False
+        whole = ((values == values.round()) & (values.abs() < 2 ** 53)).to_numpy()
+        text[whole] = values[whole].astype("int64").astype("string")
+    return text
+
+
+class LoadedReference:
+    """A memory-mapped reference table plus the key indexes built on it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        self.columns = self.table.schema.names
+        self._indexes = {}
+
+    def index(self, key, as_string=False):
+        """Hash index of key values -> row position, built once per process"""
+        cache_key = (key, as_string)
+        if cache_key not in self._indexes:
+            values = self.table.column(key).to_pandas()
+            if as_string:
+                values = _as_text(values)
+            self._indexes[cache_key] = pd.Index(values)
+        return self._indexes[cache_key]
+
+    def positions(self, key, probe):
+        """Row position of each probe value, -1 when it has no match"""
+        # numbers match numbers; anything mixed (e.g. "007" vs 7) is compared as text
+        as_string = _is_numeric(probe.dtype) != _is_numeric(self.index(key).dtype)
+        index = self.index(key, as_string)
+        if as_string:
+            probe = _as_text(probe)
+        positions = index.get_indexer(probe)
+        # a blank key matches nothing, not the reference's blank keys
+        positions[probe.isna().to_numpy()] = -1
+        return positions
+
+    def take(self, column, positions, index):
+        """Gather `column` at `positions` (nulls for -1) as a Series on `index`"""
+        missing = positions < 0
+        indices = pa.array(np.where(missing, 0, positions), mask=missing)
+        return self.table.column(column).take(indices).to_pandas().set_axis(index)
+
+    def frame(self, columns):
+        return self.table.select(columns).to_pandas()
+
+
+_cache = OrderedDict()
+
+
+def load_reference(path):
+    """Per-process LRU of mapped tables, keyed by the content-addressed path"""
+    if path in _cache:
+        _cache.move_to_end(path)
+        return _cache[path]
+    loaded = LoadedReference(path)
+    _cache[path] = loaded
+    while len(_cache) > REFERENCE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return loaded
+
+
+# paths resolved for the task being processed: each table is queried once
+# per task, on the task's own session, and every operation of the task
+# (in every pipeline) joins against the same version
+_task_paths = contextvars.ContextVar("task_reference_paths", default=None)
+
+
+def pin_references(db):
+    """Resolve lookups on `db`, once per table, until unpin_references(token)"""
+    return _task_paths.set((db, {}))
+
+
+def unpin_references(token):
+    _task_paths.reset(token)
+
+
+def _registered_path(db, name):
+    ref = db.get(ReferenceTable, name)
+    if not ref or not ref.path:
+        raise ValueError(f"Reference table '{name}' is not registered or not built yet")
+    return ref.path
+
+
+def resolve_reference_path(name):
+    pinned = _task_paths.get()
+    if pinned:
+        db, paths = pinned
+        if name not in paths:
+            paths[name] = _registered_path(db, name)
+        return paths[name]
+
+    # imported here so the join itself can be used without a database
+    from api.src.database import get_db
+    db = next(get_db())
+    try:
+        return _registered_path(db, name)
+    finally:
+        db.close()
+
+
+def lookup(df, params):
+    """
+    Enrich rows from a registered reference table.
+
+    params: table, on (or left_on/right_on), columns (default: all but the
+    key), how ("left" keeps unmatched rows, "inner" drops them) and suffix
+    for names that already exist in the frame.
+    """
+    ref = load_reference(resolve_reference_path(params["table"]))
+    left_on = params.get("left_on") or params.get("on")
+    right_on = params.get("right_on") or params.get("on")
+    how = params.get("how", "left")
+    suffix = params.get("suffix", "_ref")
+    columns = params.get("columns") or [c for c in ref.columns if c != right_on]
+
+    if left_on not in df.columns:
+        raise ValueError(f"lookup: column '{left_on}' not in data")
+    missing = [c for c in [right_on] + columns if c not in ref.columns]
+    if missing:
+        raise ValueError(f"lookup: {missing} not in reference table '{params['table']}'")
+    if how not in ("left", "inner"):
+        raise ValueError(f"lookup: unsupported join type '{how}'")
+
+    if not ref.index(right_on).is_unique:
+        # one-to-many: let pandas' hash join duplicate the matching rows
+        right = ref.frame([right_on] + columns)
+        if left_on != right_on:
+            right = right.rename(columns={right_on: left_on})
+        logger.info(f"lookup: joining on non-unique key '{right_on}'")
+        return df.merge(right, on=left_on, how=how, suffixes=("", suffix))
+
+    positions = ref.positions(right_on, df[left_on])
+    if how == "inner":
+        matched = positions >= 0
+        df = df[matched]
+        positions = positions[matched]
+    df = df.copy(deep=False)
+    for column in columns:
+        name = f"{column}{suffix}" if column in df.columns else column
+        df[name] = ref.take(column, positions, df.index)
+    logger.info(f"lookup: enriched {len(df)} rows from '{params['table']}'")
+    return df
@@ -0,0 +1,125 @@
+import os
+from contextlib import nullcontext
+
+import pandas as pd
+from loguru import logger
+
+from shared.storage import file_sha256, output_path
+from worker.src.cancellation import TaskCancelled, TaskPreempted, check_signals, remove_file
+from worker.src.csv_io import write_csv
+
+
+# Multi-config tasks: several named pipelines over one upload. The input is
+# parsed once and every pipeline starts from a shallow copy of that frame;
+# under Copy-on-Write an operation copies only the columns it changes, so a
+# column no pipeline modifies is held in memory once however many read it.
+# Pipelines run one after another and each result is written and dropped
+# before the next starts, so the peak is the shared frame plus one
+# pipeline's intermediates.
+
+
+def copy_on_write():
+    """pandas 2.x needs Copy-on-Write switched on; from 3.0 it always is"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return nullcontext()
+    return pd.option_context("mode.copy_on_write", True)
+
+
+class SharedScan:
+    """
+    The pipelines of one multi-config process_csv_task run.
+
+    Usage:
+        scan = SharedScan(task, OP_REGISTRY, resume.get("outputs"))
+        scan.run(df, report, validation, csv_options, progress)
+        task.outputs = scan.outputs
+    """
+
+    def __init__(self, task, handlers, outputs=None):
+        self.task = task
+        self.handlers = handlers
+        self.pipelines = task.config["pipelines"]
+        # name -> {status, path, sha256, size, rows} or {status, error};
+        # pipelines a preempted run already finished are not run again
+        self.outputs = dict(outputs or {})
+
+    @property
+    def failed(self):
+        return [name for name, out in self.outputs.items() if out["status"] == "failed"]
+
+    def completed(self):
+        return {name: out for name, out in self.outputs.items() if out["status"] == "completed"}
+
+    def total_size(self):
+        return sum(out.get("size") or 0 for out in self.outputs.values())
+
+    def run(self, df, report, validation, csv_options, progress):
+        """
+        Run every pipeline on `df`. A pipeline that raises is recorded as
+        failed and the rest still run; cancellation and preemption stop all.
+        `progress(current, status, operation, step, total_steps, pipelines=)`
+        """
+        steps = {name: len(ops) + 1 for name, ops in self.pipelines.items()}  # ops + write
+        done = {name: steps[name] if name in self.completed() else 0 for name in steps}
+
+        def advance(name, step, status, operation=""):
+            done[name] = step
+            finished = sum(done.values())
+            total = sum(steps.values())
+            progress(10 + int(finished / total * 85), status, operation, finished, total,
+                     pipelines={n: int(done[n] / steps[n] * 100) for n in steps})
+
+        for name, ops in self.pipelines.items():
+            if done[name]:
+                continue
+            try:
+                self.outputs[name] = self._run_one(name, ops, df, report, validation, csv_options,
+                                                   lambda i, status, op: advance(name, i, status, op))
+            except (TaskCancelled, TaskPreempted):
+                raise
+            except Exception as e:
+                # a broken pipeline doesn't cost the others their results
+                logger.error(f"Pipeline {name} of task {self.task.id} failed: {e}")
+                self.outputs[name] = {"status": "failed", "error": f"{type(e).__name__}: {e}"[:500]}
+            advance(name, steps[name], f"{name}: {self.outputs[name]['status']}")
+
+    def _run_one(self, name, ops, df, report, validation, csv_options, advance):
+        with copy_on_write():
+            frame = df.copy(deep=False)
+            for i, op in enumerate(ops):
+                check_signals(self.task.id)
+                op_name = op.get("op")
+                params = op.get("params", {})
+                advance(i, f"{name}: applying {op_name}...", op_name)
+                handler = self.handlers.get(op_name)
+                if not handler:
+                    raise ValueError(f"No handler for operation '{op_name}'")
+
+                with report.stage(f"{name}/{i + 1}:{op_name}", frame, operation=op_name) as stage:
+                    if op_name == "validate":
+                        frame = validation.apply(i, frame, params, csv_options, pipeline=name)
+                    else:
+                        frame = handler(frame, params)
+                    stage.output(frame)
+
+            check_signals(self.task.id)
+            advance(len(ops), f"{name}: saving", "Saving Results")
+            path = output_path(self.task.id, name, self.task.original_filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = f"{path}.part"
+            try:
+                with report.stage(f"{name}/write", frame) as stage:
+                    stage.note(engine=write_csv(frame, partial_path, csv_options))
+                os.replace(partial_path, path)
+            except BaseException:
+                remove_file(partial_path)
+                raise
+
+        logger.info(f"Pipeline {name}: {len(frame)} rows written to {path}")
+        return {
+            "status": "completed",
+            "path": path,
+            "sha256": file_sha256(path),
+            "size": os.path.getsize(path),
+            "rows": len(frame),
+        }
@@ -1,20 +1,38 @@
 from worker.src.celery_app import celery_app
 from sqlalchemy.orm import Session
 from datetime import datetime
-import pandas as pd
 import os
 import traceback
+from functools import partial
+from types import SimpleNamespace
 from loguru import logger
 
 # Import your existing modules
 from api.src.database import get_db
 from shared.db_models import Task
+from shared.metrics import TASK_SECONDS
+from shared.storage import file_sha256, result_path
+from worker.src.instrumentation import ExecutionReport, record_queue_wait
+from worker.src.references import lookup, pin_references, unpin_references
+from worker.src.validation import ValidationRun, validate
+from worker.src.shared_scan import SharedScan
+from worker.src.csv_io import read_csv, write_csv
+from worker.src.delta import DeltaRun, is_incremental, previous_run
+from worker.src.profiling import SamplingProfiler, should_profile
+from worker.src.cancellation import (
+    TaskCancelled, TaskPreempted, check_signals,
+    save_checkpoint, load_checkpoint, remove_file
+)
+from shared.control import clear_signal, PRIORITIES
+from shared.progress import write_progress, finish_progress
+from shared.tracing import begin_span, inject, message_header, set_service_name
 # from src.app.csv_processor import OP_REGISTRY
 
 import sys
 
 logger.add(
     sys.stderr, format="{time:MMMM D, YYYY > HH:mm:ss} • {level} • {message}")
+set_service_name("csv-worker")
 
 
 def remove_duplicates(df, params):
@@ -61,12 +79,37 @@ def fill_missing(df, params):
     return df
 
 
+def save_profile(profiler, task):
+    if profiler is None:
+        return
+    try:
+        task.profile_path = profiler.stop().save(task.id)
+        logger.info(f"Profile saved: {task.profile_path} ({profiler.samples} samples)")
+    except Exception as e:
+        logger.warning(f"Could not save profile for task {task.id}: {e}")
+
+
+def report_progress(task_id, current, status, operation="", step=0, total_steps=0, final=False,
+                    pipelines=None):
+    try:
+        if final:
+            finish_progress(task_id, status)
+        else:
+            write_progress(task_id, current, status, operation, step, total_steps,
+                           pipelines=pipelines)
+    except Exception as e:
+        # progress is cosmetic; a Redis hiccup must not fail the task
+        logger.warning(f"Could not report progress for {task_id}: {e}")
+
+
 # ----- registry -----
 OP_REGISTRY = {
     "remove_duplicates": remove_duplicates,
     "remove_missing_rows": remove_missing_rows,
     "drop_columns": drop_columns,
     "fill_missing": fill_missing,
+    "lookup": lookup,
+    "validate": validate,
     # add more later...
 }
 
@@ -79,145 +122,316 @@ OP_REGISTRY = {
     autoretry_for=(Exception,),  # Auto-retry on any exception
     retry_kwargs={'max_retries': 3}
 )
-def process_csv_task(self, task_id: str):
+def process_csv_task(self, task_id: str, headers=None):
     """
-    Process CSV file automatically when queued
+    Process CSV file automatically when queued. `headers` are the tracing
+    headers of the batch message a process_csv_batch member arrived in.
     """
     logger.info(f"🚀 Starting CSV processing for task: {task_id}")
 
     # Get database session
     db: Session = next(get_db())
+    # lookups resolve their reference tables once, on this session
+    references = pin_references(db)
+    report = ExecutionReport()
+    profiler = None
+    partial_path = None
+    delta = None
+    scan = None
+    span = None
 
     try:
         task = db.query(Task).filter(Task.id == task_id).first()
         if not task:
             raise ValueError(f"Task {task_id} not found")
 
+        # revoked messages can still be delivered after a worker restart
+        if task.status == "cancelled":
+            logger.info(f"Task {task_id} was cancelled before it started")
+            return {"task_id": task_id, "status": "cancelled"}
+
+        # join the trace started by the upload; a message header wins, since
+        # a requeued run carries the span of the run that requeued it
+        priority = (task.config or {}).get("priority", "normal")
+        request = SimpleNamespace(headers=headers) if headers else self.request
+        span = begin_span(
+            "process_csv_task",
+            parent=message_header(request, "traceparent") or task.traceparent,
+            task_id=task_id, priority=priority, retries=self.request.retries or 0)
+        report.queue_wait_seconds = record_queue_wait(request, span, priority)
+
+        # a preempted run left its intermediate frame and next operation here
+        resume = task.resume_state or {}
+        # validate summaries (and quarantine files) collected by this run
+        validation = ValidationRun(task, resume.get("validation"))
+        # multi-config: several named pipelines share one read of the input
+        if (task.config or {}).get("pipelines"):
+            scan = SharedScan(task, OP_REGISTRY, resume.get("outputs"))
+
+        # continue mode only reads what was appended since the previous run
+        if is_incremental(task.config):
+            continue_from = task.config.get("continue_from")
+            delta = DeltaRun(task, previous_run(db, continue_from) if continue_from else None)
+
         task.status = "processing"
-        task.started_at = datetime.now()
+        task.started_at = task.started_at or datetime.now()
         task.progress = 10
         db.commit()
 
+        if should_profile(task.config):
+            profiler = SamplingProfiler().start()
+
         # Initial progress update
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 5,
-                'total': 100,
-                'status': 'Starting CSV processing',
-                'operation': 'Initializing',
-                'current_step': 0,
-                'total_steps': 0,
-                'task_id': task_id
-            }
-        )
+        report_progress(task_id, 5, 'Starting CSV processing', 'Initializing')
 
         # Processing CSV begins
         input_path = task.file_path
-        df = pd.read_csv(input_path)
+        csv_options = (task.config or {}).get("csv") or {}
+        if resume.get("checkpoint") and os.path.exists(resume["checkpoint"]):
+            with report.stage("resume") as stage:
+                df = load_checkpoint(resume["checkpoint"])
+                stage.output(df)
+            start_op = resume.get("next_op", 0)
+            logger.info(f"Resumed task {task_id} at operation {start_op + 1}")
+        else:
+            with report.stage("read") as stage:
+                if delta:
+                    df, engine = delta.read(csv_options)
+                else:
+                    df, engine = read_csv(input_path, csv_options)
+                stage.output(df)
+                stage.note(engine=engine)
+            start_op = 0
 
         logger.info(f"Read CSV with {len(df)} rows, {len(df.columns)} columns")
+        next_op = start_op
+        check_signals(task_id)
 
         # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 10,
-                'total': 100,
-                'status': 'CSV file loaded',
-                'operation': 'File Reading',
-                'current_step': 1,
-                'total_steps': 5,
-                'task_id': task_id
-            }
-        )
+        report_progress(task_id, 10, 'CSV file loaded', 'File Reading', 1, 5)
         # task.progress = 30
         # db.commit()
 
-        if task.config and isinstance(task.config, dict):
+        if scan:
+            scan.run(df, report, validation, csv_options, partial(report_progress, task_id))
+        elif task.config and isinstance(task.config, dict):
             ops = task.config.get("operations", [])
             total_ops = max(1, len(ops))
 
             for i, op in enumerate(ops):
+                if i < start_op:
+                    continue
+                next_op = i
+                check_signals(task_id)
+
                 op_name = op.get("op")
                 params = op.get("params", {})
 
-                # Send detailed progress update
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        # 10-90%
-                        'current': int(((i + 1) / max(1, total_ops)) * 80) + 10,
-                        'total': 100,
-                        'status': f'Applying {op_name}...',
-                        'operation': op_name,
-                        'current_step': i + 2,  # +2 because step 1 was file reading
-                        'total_steps': total_ops + 1,  # +1 for file reading
-                        'task_id': task_id,
-                        'params': str(params)[:100]  # Truncate long params
-                    }
-                )
+                # Send detailed progress update (10-90%); step 1 was file reading
+                report_progress(
+                    task_id, int(((i + 1) / total_ops) * 80) + 10, f'Applying {op_name}...',
+                    op_name, i + 2, total_ops + 1)
                 logger.info(f"Applying operation {i+1}/{total_ops}: {op_name}")
                 handler = OP_REGISTRY.get(op_name)
                 if not handler:
                     raise ValueError(f"No handler for operation '{op_name}'")
 
-                df = handler(df, params)
+                with report.stage(f"{i + 1}:{op_name}", df, operation=op_name) as stage:
+                    if op_name == "validate":
+                        df = validation.apply(i, df, params, csv_options)
+                    elif delta:
+                        df = delta.apply(i, op_name, params, df, handler)
+                    else:
+                        df = handler(df, params)
+                    stage.output(df)
 
                 # Update progress for each operation
                 # progress = 30 + int((i + 1) / total_ops * 60)
                 # task.progress = progress
                 # db.commit()
+            next_op = len(ops)
+
+        if scan:
+            # each pipeline wrote its own output; the ones that succeeded
+            # stay downloadable even if another failed
+            task.outputs = scan.outputs
+            task.result_size = scan.total_size()
+            task.status = "failed" if scan.failed else "completed"
+            if scan.failed:
+                task.error_message = "Pipelines failed: " + "; ".join(
+                    f"{name}: {scan.outputs[name]['error']}" for name in scan.failed)
+        else:
+            # Processing Ends
+            report_progress(task_id, 95, 'Saving processed file', 'Saving Results',
+                            total_ops + 2, total_ops + 2)
+            # task.progress = 90
+            # db.commit()
+
+            check_signals(task_id)
+            # one directory per task, so equal original names never collide
+            output_path = result_path(task_id, task.original_filename)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # write beside the target and rename, so a cancelled or crashed run
+            # never leaves a truncated result behind
+            partial_path = f"{output_path}.part"
+            with report.stage("write", df) as stage:
+                if delta:
+                    stage.note(engine=delta.write(df, partial_path, csv_options))
+                else:
+                    stage.note(engine=write_csv(df, partial_path, csv_options))
+            os.replace(partial_path, output_path)
+            partial_path = None
+            task.status = "completed"
+            task.result_path = output_path
+            task.result_sha256 = file_sha256(output_path)
+            task.result_size = os.path.getsize(output_path)
+        remove_file(resume.get("checkpoint"))
 
-        # Processing Ends
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 95,
-                'total': 100,
-                'status': 'Saving processed file',
-                'operation': 'Saving Results',
-                'current_step': total_ops + 2,
-                'total_steps': total_ops + 2,
-                'task_id': task_id
-            }
-        )
-        # task.progress = 90
-        # db.commit()
+        task.completed_at = datetime.now()
+        task.progress = 100
+        task.resume_state = None
+        if delta:
+            task.delta_state = delta.finish()
+        task.validation_report = validation.reports or None
+        task.execution_report = report.to_dict()
+        save_profile(profiler, task)
+        db.commit()
+        TASK_SECONDS.labels(status=task.status).observe(
+            task.execution_report["total_seconds"])
 
-        os.makedirs('output', exist_ok=True)
+        report_progress(task_id, 100, task.status.capitalize(), final=True)
+        logger.info(f"✅ Task {task_id} finished: {task.status}")
 
-        output_filename = f"processed_{task.original_filename}"
-        output_path = os.path.join('output', output_filename)
-        df.to_csv(output_path, index=False)
+        # the API reads results from the Task row; keep the backend entry tiny
+        return {"task_id": task_id, "status": task.status}
 
-        task.status = "completed"
+    except TaskCancelled:
+        logger.info(f"🛑 Task {task_id} cancelled")
+        remove_file(partial_path)
+        remove_file(resume.get("checkpoint"))
+        clear_signal(task_id)
+
+        task.status = "cancelled"
         task.completed_at = datetime.now()
-        task.result_path = output_path
-        task.progress = 100
+        task.resume_state = None
+        task.execution_report = report.to_dict()
+        save_profile(profiler, task)
+        db.commit()
+        TASK_SECONDS.labels(status="cancelled").observe(
+            task.execution_report["total_seconds"])
+        report_progress(task_id, 100, 'Cancelled', final=True)
+        return {"task_id": task_id, "status": "cancelled"}
+
+    except TaskPreempted:
+        # park the intermediate frame and go to the back of the queue with
+        # low priority; the next run resumes at `next_op`. Continue-mode runs
+        # start over instead: their operation state lives in memory and the
+        # delta is cheap to re-read. Multi-config runs re-read the input and
+        # skip the pipelines that already wrote their output.
+        logger.info(f"⏸️ Task {task_id} preempted before operation {next_op + 1}")
+
+        task.status = "queued"
+        task.queued_at = datetime.now()
+        if delta:
+            task.resume_state = None
+        elif scan:
+            task.resume_state = {"outputs": scan.completed(), "validation": validation.reports}
+        else:
+            checkpoint = save_checkpoint(task_id, df)
+            task.resume_state = {"checkpoint": checkpoint, "next_op": next_op,
+                                 "validation": validation.reports}
+        task.execution_report = report.to_dict()
+        save_profile(profiler, task)
         db.commit()
 
-        logger.info(f"✅ Task {task_id} completed successfully")
-
-        return {
-            "task_id": task_id,
-            "status": "completed",
-            "result_path": output_path,
-            "rows_processed": len(df),
-            "columns_processed": len(df.columns)
-        }
+        report_progress(task_id, 0, 'Preempted, waiting to resume', 'Queued')
+        result = self.apply_async(args=[task_id], priority=PRIORITIES["low"], headers=inject())
+        task.celery_task_id = result.id
+        db.commit()
+        return {"task_id": task_id, "status": "preempted"}
 
     except Exception as e:
         logger.error(f"❌ Task {task_id} failed: {e}")
         logger.error(traceback.format_exc())
 
+        if delta and 'output_path' in locals():
+            # an unfinished append gives the previous task its result back
+            delta.restore(partial_path or output_path)
+        remove_file(partial_path)
         if 'task' in locals() and task:
             task.status = "failed"
             task.error_message = f"{str(e)}\n\n{traceback.format_exc()}"
             task.completed_at = datetime.now()
+            if 'validation' in locals():
+                task.validation_report = validation.reports or None
+            if scan:
+                task.outputs = scan.outputs
+            task.execution_report = report.to_dict()
+            save_profile(profiler, task)
             db.commit()
+        TASK_SECONDS.labels(status="failed").observe(
+            report.to_dict()["total_seconds"])
+        report_progress(task_id, 100, 'Failed', final=True)
 
         raise e
     finally:
+        if span:
+            span.set(status=task.status)
+            span.end(error=sys.exc_info()[1])
+        unpin_references(references)
         if 'db' in locals():
             db.close()
+
+
+@celery_app.task(bind=True, name='process_csv_batch')
+def process_csv_batch(self, task_ids):
+    """
+    Run several small tasks (an inbox micro-batch) one after another in one
+    worker slot, sharing the broker round trip and the warm process.
+    """
+    # members are called directly and don't see this message's headers;
+    # hand them over so each records its queue wait and joins the trace
+    headers = {key: message_header(self.request, key) for key in ("traceparent", "enqueued_at")}
+    for i, task_id in enumerate(task_ids):
+        try:
+            result = process_csv_task(task_id, headers=headers)
+        except Exception as e:
+            # called directly, process_csv_task skips its autoretry: give the
+            # member the retries it would have had as a message of its own
+            logger.error(f"Batch member {task_id} failed, retrying it alone: {e}")
+            retry_task(task_id)
+            continue
+        if result.get("status") == "preempted":
+            # give the slot back now; the rest go back to the queue on their own
+            requeue_tasks(task_ids[i + 1:], PRIORITIES["low"])
+            break
+    return {"tasks": len(task_ids)}
+
+
+def retry_task(task_id):
+    """Queue a failed batch member's first retry, counted like an autoretry"""
+    db: Session = next(get_db())
+    try:
+        task = db.get(Task, task_id)
+        task.status = "queued"
+        task.queued_at = datetime.now()
+        db.commit()
+        task.celery_task_id = process_csv_task.apply_async(
+            args=[task_id], countdown=process_csv_task.default_retry_delay, retries=1,
+            priority=PRIORITIES[(task.config or {}).get("priority", "normal")],
+            headers=inject()).id
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_tasks(task_ids, priority):
+    db: Session = next(get_db())
+    try:
+        for task in db.query(Task).filter(Task.id.in_(task_ids), Task.status == "queued"):
+            task.celery_task_id = process_csv_task.apply_async(
+                args=[task.id], priority=priority, headers=inject()).id
+            task.queued_at = datetime.now()
+        db.commit()
+    finally:
+        db.close()
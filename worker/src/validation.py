@@ -0,0 +1,264 @@
+import os
+import re
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+
+from shared.storage import file_sha256, result_dir
+from worker.src.csv_io import write_csv
+
+
+# The `validate` operation. Each rule is compiled once into a function from
+# a block of rows to a boolean "violates" array; blocks of
+# VALIDATE_CHUNK_ROWS keep the temporaries (regex results, numeric casts)
+# small however long the file is. Which rules a row broke is kept as one
+# bitmask per row, so the summary, the sample and the quarantine file all
+# come from the same pass.
+VALIDATE_CHUNK_ROWS = int(os.getenv("VALIDATE_CHUNK_ROWS", 1_000_000))
+DEFAULT_SAMPLE_ROWS = 20
+MAX_SAMPLE_ROWS = 1000
+MAX_RULES = 64
+CHECKS = ("not_null", "regex", "range", "allowed", "unique")
+ACTIONS = ("report", "drop", "quarantine")
+FAILED_RULES_COLUMN = "_failed_rules"
+
+
+def _not_null(columns):
+    def evaluate(chunk):
+        return chunk[columns].isna().any(axis=1).to_numpy()
+    return evaluate
+
+
+def _regex(column, pattern):
+    # whole-value match, as re.fullmatch; nulls are left to not_null
+    anchored = f"^(?:{pattern})$"
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex for {column}: {e}")
+    use_arrow = [True]
+
+    def evaluate(chunk):
+        values = chunk[column]
+        if use_arrow[0]:
+            try:
+                # RE2 in Arrow runs over the whole block in C++
+                array = pa.array(values, from_pandas=True)
+                if not pa.types.is_string(array.type) and not pa.types.is_large_string(array.type):
+                    array = pc.cast(array, pa.string())
+                matched = pc.match_substring_regex(array, anchored)
+                return ~np.asarray(matched.fill_null(True), dtype=bool)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+                # lookarounds, backreferences and mixed-type columns
+                logger.info(f"validate: regex on {column} falls back to Python re: {e}")
+                use_arrow[0] = False
+        matched = values.astype("string").str.fullmatch(pattern)
+        return ~matched.fillna(True).to_numpy(dtype=bool)
+    return evaluate
+
+
+def _range(column, low, high):
+    def evaluate(chunk):
+        values = chunk[column]
+        numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        # text that isn't a number is out of any range; blanks are not_null's job
+        bad = np.isnan(numbers) & values.notna().to_numpy()
+        if low is not None:
+            bad |= numbers < low
+        if high is not None:
+            bad |= numbers > high
+        return bad
+    return evaluate
+
+
+def _allowed(column, allowed):
+    def evaluate(chunk):
+        values = chunk[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            choices = pd.to_numeric(pd.Series(allowed), errors="coerce").dropna().unique()
+        else:
+            choices = [str(v) for v in allowed]
+            values = values.astype("string")
+        return (~values.isin(choices) & values.notna()).to_numpy(dtype=bool)
+    return evaluate
+
+
+def _unique(columns):
+    # needs every row at once; pandas hashes the keys exactly, no collisions
+    def evaluate(df):
+        repeated = df.duplicated(subset=columns, keep="first")
+        return (repeated & df[columns].notna().all(axis=1)).to_numpy()
+    return evaluate
+
+
+def compile_rules(specs, columns):
+    """[(name, check, columns, evaluate, whole_frame)] for the rule dicts in params"""
+    if not specs:
+        raise ValueError("validate needs at least one rule")
+    if len(specs) > MAX_RULES:
+        raise ValueError(f"validate supports at most {MAX_RULES} rules")
+    rules = []
+    for spec in specs:
+        check = spec.get("check")
+        if check not in CHECKS:
+            raise ValueError(f"Unknown validation check {check!r}; use one of {', '.join(CHECKS)}")
+        cols = spec.get("columns") or ([spec["column"]] if spec.get("column") else [])
+        missing = [c for c in cols if c not in columns]
+        if not cols or missing:
+            raise ValueError(f"Rule {check} needs existing columns (missing: {missing or 'none given'})")
+        if check != "unique" and check != "not_null" and len(cols) != 1:
+            raise ValueError(f"Rule {check} applies to exactly one column")
+
+        if check == "not_null":
+            evaluate = _not_null(cols)
+        elif check == "regex":
+            evaluate = _regex(cols[0], spec["pattern"])
+        elif check == "range":
+            evaluate = _range(cols[0], spec.get("min"), spec.get("max"))
+        elif check == "allowed":
+            evaluate = _allowed(cols[0], spec["values"])
+        else:
+            evaluate = _unique(cols)
+        name = spec.get("name") or f"{check}:{'+'.join(cols)}"
+        rules.append((name, check, cols, evaluate, check == "unique"))
+    return rules
+
+
+def _mask_dtype(count):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if count <= np.iinfo(dtype).bits:
+            return dtype
+
+
+def evaluate_rules(df, rules):
+    """(bitmask per row, violation count per rule); bit k set = rule k failed"""
+    dtype = _mask_dtype(len(rules))
+    masks = np.zeros(len(df), dtype=dtype)
+    counts = [0] * len(rules)
+    row_rules = [(k, rule) for k, rule in enumerate(rules) if not rule[4]]
+
+    for start in range(0, len(df), VALIDATE_CHUNK_ROWS):
+        chunk = df.iloc[start:start + VALIDATE_CHUNK_ROWS]
+        block = masks[start:start + len(chunk)]
+        for k, (_, _, _, evaluate, _) in row_rules:
+            bad = evaluate(chunk)
+            counts[k] += int(np.count_nonzero(bad))
+            block[bad] |= dtype(1 << k)
+
+    for k, (_, _, _, evaluate, whole_frame) in enumerate(rules):
+        if whole_frame:
+            bad = evaluate(df)
+            counts[k] = int(np.count_nonzero(bad))
+            masks[bad] |= dtype(1 << k)
+    return masks, counts
+
+
+def failed_rule_names(masks, rules):
+    """'rule;rule' per row, built once per distinct bitmask"""
+    names = {}
+    for mask in np.unique(masks):
+        names[mask] = ";".join(rules[k][0] for k in range(len(rules)) if int(mask) >> k & 1)
+    return pd.Series(masks).map(names).to_numpy()
+
+
+def _sample(df, masks, failed, rules, size):
+    positions = np.flatnonzero(failed)[:size]
+    if not len(positions):
+        return []
+    rows = df.iloc[positions]
+    # to_json handles NaN, timestamps and numpy scalars
+    values = json.loads(rows.to_json(orient="records", date_format="iso"))
+    reasons = failed_rule_names(masks[positions], rules)
+    return [
+        {"row": int(label) if isinstance(label, (int, np.integer)) else str(label),
+         "failed": reason.split(";"), "values": record}
+        for label, reason, record in zip(rows.index, reasons, values)
+    ]
+
+
+def check_rows(df, params, quarantine_path=None, csv_options=None):
+    """
+    Check `df` against params["rules"]. Returns (rows to keep, summary).
+
+    params: rules (list of {check, column|columns, pattern|min|max|values,
+    name}), action ("report" keeps every row, "drop" removes failing rows,
+    "quarantine" also writes them to `quarantine_path`), sample_size.
+    """
+    rules = compile_rules(params.get("rules"), df.columns)
+    action = params.get("action", "report")
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown validate action {action!r}; use one of {', '.join(ACTIONS)}")
+    sample_size = min(int(params.get("sample_size", DEFAULT_SAMPLE_ROWS)), MAX_SAMPLE_ROWS)
+
+    masks, counts = evaluate_rules(df, rules)
+    failed = masks != 0
+    rows_failed = int(np.count_nonzero(failed))
+    summary = {
+        "rows_checked": len(df),
+        "rows_failed": rows_failed,
+        "action": action,
+        "rules": [{"name": name, "check": check, "columns": cols, "violations": count}
+                  for (name, check, cols, _, _), count in zip(rules, counts)],
+        "sample": _sample(df, masks, failed, rules, sample_size),
+    }
+    logger.info(f"validate: {rows_failed} of {len(df)} rows failed {len(rules)} rules")
+
+    if action == "report" or not rows_failed:
+        return df, summary
+    if action == "quarantine" and quarantine_path:
+        rejected = df[failed].copy(deep=False)
+        rejected[FAILED_RULES_COLUMN] = failed_rule_names(masks[failed], rules)
+        write_csv(rejected, quarantine_path, csv_options)
+        summary["quarantine"] = {
+            "rows": rows_failed,
+            "path": quarantine_path,
+            "sha256": file_sha256(quarantine_path),
+        }
+    return df[~failed], summary
+
+
+def validate(df, params):
+    """OP_REGISTRY form: the rows to keep, without the summary"""
+    return check_rows(df, params)[0]
+
+
+def quarantine_path(task_id, operation, original_filename, pipeline=None):
+    prefix = f"{pipeline}_" if pipeline else ""
+    return os.path.join(result_dir(task_id), f"quarantine_{prefix}{operation}_{original_filename}")
+
+
+class ValidationRun:
+    """
+    The validate operations of one process_csv_task run.
+
+    Usage:
+        validation = ValidationRun(task, resume.get("validation"))
+        df = validation.apply(i, df, params, csv_options)
+        task.validation_report = validation.reports
+
+    In a multi-config task each summary also names its `pipeline`.
+    """
+
+    def __init__(self, task, reports=None):
+        self.task = task
+        self.reports = list(reports or [])
+
+    def apply(self, index, df, params, csv_options=None, pipeline=None):
+        operation = index + 1
+        path = None
+        if params.get("action") == "quarantine":
+            path = quarantine_path(self.task.id, operation, self.task.original_filename, pipeline)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        df, summary = check_rows(df, params, path, csv_options)
+        summary["operation"] = operation
+        if pipeline:
+            summary["pipeline"] = pipeline
+        # a resumed run may repeat an operation; keep its latest summary
+        key = (pipeline, operation)
+        self.reports = [r for r in self.reports
+                        if (r.get("pipeline"), r["operation"]) != key] + [summary]
+        return df